@@ -0,0 +1,91 @@
+"""
+Benchmark de arranque de la interfaz.
+
+Mide, en procesos nuevos (incluyendo el arranque del intérprete y las importaciones):
+    - tiempo hasta el primer pintado de la ventana,
+    - tiempo hasta la primera miniatura interactiva,
+    - tiempo hasta que el procesador (OpenCV y clasificador) queda cargado.
+
+Uso (desde la raíz del proyecto, con un servidor gráfico disponible):
+    python -m benchmarks.arranque --repeticiones 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tempfile
+import subprocess
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir_en_proceso(inicio, tiempo_maximo=30.0):
+    """
+    Arranca la interfaz en el proceso actual y mide los hitos de arranque.
+
+    Args:
+        inicio (float): Instante (time.time) en que se lanzó el proceso.
+        tiempo_maximo (float): Segundos máximos de espera.
+
+    Returns:
+        dict: Milisegundos desde el lanzamiento hasta cada hito (None si no se alcanzó).
+    """
+    import tkinter as tk
+    from interfaz import InterfazSimetriaGatos
+
+    importado = time.time()
+    root = tk.Tk()
+    # Índice temporal: la medición no debe leer ni escribir el resultados.db real
+    temporal = tempfile.TemporaryDirectory()
+    app = InterfazSimetriaGatos(root, ruta_indice=os.path.join(temporal.name, 'resultados.db'))
+
+    hitos = {'importacion': importado, 'primer_pintado': None,
+             'primera_miniatura': None, 'procesador_listo': None}
+    limite = time.time() + tiempo_maximo
+    while time.time() < limite:
+        root.update()
+        ahora = time.time()
+        if hitos['primer_pintado'] is None and root.winfo_ismapped():
+            hitos['primer_pintado'] = ahora
+        if hitos['primera_miniatura'] is None and any(t.winfo_ismapped() for t in app.tarjetas.values()):
+            hitos['primera_miniatura'] = ahora
+        if hitos['procesador_listo'] is None and app.procesador_listo.is_set():
+            hitos['procesador_listo'] = ahora
+        if all(v is not None for v in hitos.values()):
+            break
+        time.sleep(0.001)
+    # cerrar() también detiene el pool de puntuación en segundo plano y el de filtros
+    app.cerrar()
+    temporal.cleanup()
+
+    return {k: round((v - inicio) * 1000, 1) if v is not None else None for k, v in hitos.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de la interfaz")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--hijo', type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo is not None:
+        print(json.dumps(medir_en_proceso(args.hijo)))
+        return
+
+    mediciones = []
+    for _ in range(args.repeticiones):
+        inicio = time.time()
+        salida = subprocess.run([sys.executable, '-m', 'benchmarks.arranque', '--hijo', repr(inicio)],
+                                cwd=RAIZ_PROYECTO, capture_output=True, text=True, check=True)
+        mediciones.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    print(f"Arranque de la interfaz ({args.repeticiones} repeticiones, mediana en ms):")
+    for hito in ('importacion', 'primer_pintado', 'primera_miniatura', 'procesador_listo'):
+        valores = [m[hito] for m in mediciones if m[hito] is not None]
+        mediana = f"{statistics.median(valores):8.1f}" if valores else "     n/d"
+        print(f"  {hito:<20}{mediana}")
+
+
+if __name__ == "__main__":
+    main()
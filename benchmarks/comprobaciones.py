@@ -0,0 +1,335 @@
+"""
+Comprobaciones de extremo a extremo en la máquina local.
+
+Ejecución particionada (ejecucion_lotes.py) con varios procesos de nodo:
+    - cada partición se lanza como un proceso independiente, todas a la vez,
+      y la combinación debe cubrir cada imagen exactamente una vez con la
+      misma puntuación que una ejecución en un solo proceso,
+    - tras una caída simulada que deja una línea incompleta al final de un
+      punto de control (cortada a mitad, o JSON válido sin salto de línea),
+      la combinación no debe modificar el archivo ni contar esa línea, y al
+      reanudar la partición la imagen se vuelve a procesar una sola vez.
+
+Servicio HTTP (servicio_http.py) en localhost:
+    - solicitudes válidas y mal formadas (JSON que no es un objeto, 'rutas'
+      que no es una lista, Content-Length no numérico o negativo, cuerpo que
+      no es una imagen...) enviadas a la vez desde varios hilos: cada una debe
+      recibir su código (200, 400 o 422) sin cortar la conexión, y el servicio
+      debe seguir respondiendo después,
+    - un proceso de trabajo terminado con SIGKILL, en reposo y con un lote en
+      vuelo: las solicitudes afectadas reciben un 503 inmediato (no esperan al
+      tiempo máximo), /salud informa del pool roto o recreado y las siguientes
+      solicitudes se atienden con el pool nuevo,
+    - una espera agotada se responde con 504 y un mensaje no vacío.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.comprobaciones img --particiones 3 --perfil rapido --concurrencia 16
+
+Termina con código 1 si alguna comprobación falla.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import time
+import random
+import signal
+import multiprocessing
+import threading
+import subprocess
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from configuracion import EXTENSIONES_IMAGEN
+from ejecucion_lotes import combinar_particiones, ruta_punto_control
+from perfiles import obtener_perfil
+from procesamiento_imagenes import ProcesadorImagenes
+from servicio_http import ServicioPuntuacion
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Comprobaciones:
+    """
+    Registra el resultado de cada comprobación y lo muestra por consola.
+    """
+
+    def __init__(self):
+        self.fallos = 0
+
+    def comprobar(self, condicion, descripcion):
+        if not condicion:
+            self.fallos += 1
+        print(f"  [{'OK' if condicion else 'FALLO'}] {descripcion}")
+        return condicion
+
+
+def ejecutar_particiones(lista, dir_salida, particiones, num_particiones, perfil):
+    """
+    Lanza las particiones indicadas como procesos independientes, todos a la vez,
+    y espera a que terminen.
+
+    Returns:
+        list: Código de salida de cada proceso.
+    """
+    procesos = [subprocess.Popen([sys.executable, os.path.join(RAIZ_PROYECTO, 'ejecucion_lotes.py'), 'ejecutar',
+                                  lista, dir_salida, '--particion', str(particion),
+                                  '--num-particiones', str(num_particiones), '--procesos', '1',
+                                  '--perfil', perfil],
+                                 cwd=RAIZ_PROYECTO, stdout=subprocess.DEVNULL)
+                for particion in particiones]
+    return [proceso.wait() for proceso in procesos]
+
+
+def leer_jsonl(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+def comprobar_particiones(rutas, num_particiones, perfil, comprobaciones):
+    """
+    Ejecuta las particiones en paralelo, las combina y simula una caída con una
+    línea incompleta al final de un punto de control.
+    """
+    procesador = ProcesadorImagenes(perfil=obtener_perfil(perfil))
+    referencia = {ruta: procesador.puntuar_segun_perfil(procesador.cargar_para_puntuar(ruta))['puntuacion_simetria']
+                  for ruta in rutas}
+
+    with tempfile.TemporaryDirectory() as temporal:
+        lista = os.path.join(temporal, 'rutas.txt')
+        with open(lista, 'w', encoding='utf-8') as f:
+            f.write(''.join(ruta + '\n' for ruta in rutas))
+        dir_salida = os.path.join(temporal, 'salida')
+        destino = os.path.join(temporal, 'combinado.jsonl')
+
+        print(f"Particiones: {len(rutas)} imágenes en {num_particiones} procesos de nodo, perfil '{perfil}'")
+        codigos = ejecutar_particiones(lista, dir_salida, range(num_particiones), num_particiones, perfil)
+        comprobaciones.comprobar(all(c == 0 for c in codigos), f"todas las particiones terminan (códigos {codigos})")
+
+        resumen = combinar_particiones(dir_salida, num_particiones, destino)
+        combinado = leer_jsonl(destino)
+        comprobaciones.comprobar(not resumen['particiones_faltantes'] and
+                                 sorted(r['ruta'] for r in combinado) == sorted(rutas),
+                                 "la combinación cubre cada imagen exactamente una vez")
+        comprobaciones.comprobar(all(r['resultado']['puntuacion_simetria'] == referencia[r['ruta']]
+                                     for r in combinado if 'resultado' in r),
+                                 "las puntuaciones coinciden con las de un solo proceso")
+
+        # Caída simulada: la última línea de un punto de control queda incompleta
+        particion = next(p for p in range(num_particiones)
+                         if os.path.getsize(ruta_punto_control(dir_salida, p, num_particiones)))
+        ruta_control = ruta_punto_control(dir_salida, particion, num_particiones)
+        with open(ruta_control, 'rb') as f:
+            lineas = f.readlines()
+        perdida = json.loads(lineas[-1])['ruta']
+
+        for caso, cola in (("cortada a mitad", lineas[-1][:len(lineas[-1]) // 2]),
+                           ("JSON válido sin salto de línea", lineas[-1].rstrip(b'\n'))):
+            with open(ruta_control, 'wb') as f:
+                f.writelines(lineas[:-1])
+                f.write(cola)
+            tamano = os.path.getsize(ruta_control)
+
+            resumen = combinar_particiones(dir_salida, num_particiones, destino)
+            comprobaciones.comprobar(os.path.getsize(ruta_control) == tamano,
+                                     f"{caso}: la combinación no modifica el punto de control")
+            comprobaciones.comprobar(resumen['registros'] == len(rutas) - 1 and
+                                     perdida not in {r['ruta'] for r in leer_jsonl(destino)},
+                                     f"{caso}: la combinación descarta la línea incompleta")
+
+            codigos = ejecutar_particiones(lista, dir_salida, [particion], num_particiones, perfil)
+            try:
+                registros = leer_jsonl(ruta_control)
+            except ValueError:
+                registros = None
+            comprobaciones.comprobar(codigos == [0] and registros is not None and
+                                     [r['ruta'] for r in registros].count(perdida) == 1 and
+                                     len(registros) == len(lineas),
+                                     f"{caso}: al reanudar, la imagen se procesa de nuevo una sola vez")
+
+        resumen = combinar_particiones(dir_salida, num_particiones, destino)
+        comprobaciones.comprobar(resumen['registros'] == len(rutas),
+                                 "tras reanudar, la combinación vuelve a cubrir todas las imágenes")
+
+
+def solicitar(direccion, cuerpo, cabeceras, metodo='POST', ruta='/puntuar'):
+    """
+    Envía una solicitud (por defecto, POST /puntuar) con cabeceras escritas tal
+    cual (incluido un Content-Length arbitrario) y devuelve el código y el JSON
+    de la respuesta.
+
+    Returns:
+        tuple: (codigo, contenido), o (None, mensaje) si se cortó la conexión.
+    """
+    host, puerto = direccion.split('//')[1].split(':')
+    conexion = http.client.HTTPConnection(host, int(puerto), timeout=60)
+    try:
+        conexion.putrequest(metodo, ruta)
+        for nombre, valor in cabeceras.items():
+            conexion.putheader(nombre, valor)
+        conexion.endheaders(cuerpo)
+        respuesta = conexion.getresponse()
+        return respuesta.status, json.loads(respuesta.read())
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        return None, f"{type(e).__name__}: {e}"
+    finally:
+        conexion.close()
+
+
+def comprobar_servicio(rutas, perfil, concurrencia, repeticiones, comprobaciones):
+    """
+    Arranca el servicio en un puerto libre de localhost y le envía a la vez
+    solicitudes válidas y mal formadas.
+    """
+    ruta = rutas[0]
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    json_ = 'application/json'
+
+    def cuerpo_json(contenido):
+        cuerpo = contenido.encode('utf-8')
+        return cuerpo, {'Content-Type': json_, 'Content-Length': str(len(cuerpo))}
+
+    # (descripción, cuerpo, cabeceras, código esperado)
+    casos = [
+        ("ruta válida", *cuerpo_json(json.dumps({'ruta': ruta})), 200),
+        ("lista de rutas válida", *cuerpo_json(json.dumps({'rutas': rutas[:3]})), 200),
+        ("bytes de imagen", datos, {'Content-Type': 'image/jpeg', 'Content-Length': str(len(datos))}, 200),
+        ("JSON que es una lista", *cuerpo_json('[1, 2]'), 400),
+        ("JSON que es una cadena", *cuerpo_json('"img/gato.jpg"'), 400),
+        ("'rutas' como cadena", *cuerpo_json(json.dumps({'rutas': ruta})), 400),
+        ("'rutas' con elementos que no son rutas", *cuerpo_json(json.dumps({'rutas': [ruta, 5]})), 400),
+        ("'ruta' numérica", *cuerpo_json(json.dumps({'ruta': 5})), 400),
+        ("perfil que no es una cadena", *cuerpo_json(json.dumps({'ruta': ruta, 'perfil': ['rapido']})), 400),
+        ("perfil desconocido", *cuerpo_json(json.dumps({'ruta': ruta, 'perfil': 'inexistente'})), 400),
+        ("JSON sin 'ruta' ni 'rutas'", *cuerpo_json('{}'), 400),
+        ("JSON no válido", *cuerpo_json('{"ruta": '), 400),
+        ("Content-Length no numérico", b'x', {'Content-Type': 'image/jpeg', 'Content-Length': 'abc'}, 400),
+        ("Content-Length negativo", b'', {'Content-Type': 'image/jpeg', 'Content-Length': '-5'}, 400),
+        ("cuerpo vacío", b'', {'Content-Type': 'image/jpeg', 'Content-Length': '0'}, 400),
+        ("cuerpo que no es una imagen", b'no es una imagen',
+         {'Content-Type': 'image/jpeg', 'Content-Length': '16'}, 422),
+        ("ruta inexistente", *cuerpo_json(json.dumps({'ruta': ruta + '.no_existe'})), 422),
+    ]
+    envios = casos * repeticiones
+    random.Random(0).shuffle(envios)
+
+    print(f"Servicio HTTP: {len(envios)} solicitudes desde {concurrencia} hilos, perfil '{perfil}'")
+    servicio = ServicioPuntuacion('127.0.0.1', 0, num_procesos=1, tiempo_espera=30, perfil=perfil)
+    servicio.iniciar()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            respuestas = list(pool.map(lambda caso: solicitar(servicio.direccion, caso[1], caso[2]), envios))
+
+        for descripcion, _, _, esperado in casos:
+            obtenidos = sorted({str(codigo) for (d, _, _, _), (codigo, _) in zip(envios, respuestas)
+                                if d == descripcion})
+            comprobaciones.comprobar(obtenidos == [str(esperado)],
+                                     f"{descripcion}: {esperado} (obtenido {', '.join(obtenidos)})")
+
+        codigo, sin_previsualizaciones = solicitar(servicio.direccion, *cuerpo_json(json.dumps({'ruta': ruta})))
+        comprobaciones.comprobar(codigo == 200, "el servicio sigue respondiendo después")
+
+        _, con_previsualizaciones = solicitar(servicio.direccion, *cuerpo_json(json.dumps({'ruta': ruta})),
+                                              ruta='/puntuar?previsualizaciones=1')
+        con_previsualizaciones.pop('previsualizaciones', None)
+        comprobaciones.comprobar(con_previsualizaciones == sin_previsualizaciones,
+                                 "las previsualizaciones no cambian la puntuación ni las cajas")
+
+        comprobar_caida_proceso(servicio, rutas, cuerpo_json, comprobaciones)
+    finally:
+        servicio.detener()
+
+
+def matar_procesos_trabajo():
+    """
+    Termina con SIGKILL los procesos de trabajo del pool del servicio (los
+    únicos procesos hijos creados con multiprocessing).
+    """
+    for proceso in multiprocessing.active_children():
+        os.kill(proceso.pid, signal.SIGKILL)
+
+
+def comprobar_caida_proceso(servicio, rutas, cuerpo_json, comprobaciones):
+    """
+    Mata los procesos de trabajo del servicio en reposo y con un lote en vuelo,
+    y comprueba que se recupera sin esperar al tiempo máximo de las solicitudes.
+    """
+    print(f"Servicio HTTP: caída de procesos de trabajo (espera máxima {servicio.tiempo_espera} s)")
+    una_ruta = cuerpo_json(json.dumps({'ruta': rutas[0]}))
+    muchas_rutas = cuerpo_json(json.dumps({'rutas': rutas * 4}))
+
+    def salud():
+        return solicitar(servicio.direccion, None, {}, 'GET', '/salud')
+
+    def cronometrar(cuerpo):
+        inicio = time.monotonic()
+        codigo, contenido = solicitar(servicio.direccion, *cuerpo)
+        return codigo, contenido, time.monotonic() - inicio
+
+    # En reposo: ningún lote nota la caída, pero /salud sí
+    matar_procesos_trabajo()
+    time.sleep(0.5)
+    codigo, contenido = salud()
+    comprobaciones.comprobar(codigo == 503 and contenido.get('estado') == 'pool_roto' or
+                             codigo == 200 and contenido.get('reinicios_pool', 0) >= 1,
+                             f"en reposo: /salud informa del pool roto o recreado ({codigo}, {contenido.get('estado')})")
+    codigo, _, segundos = cronometrar(una_ruta)
+    comprobaciones.comprobar(codigo == 200, f"en reposo: la siguiente solicitud se atiende ({codigo}, {segundos:.1f} s)")
+
+    # Con un lote en vuelo: esa solicitud falla enseguida con 503
+    respuestas = []
+    hilo = threading.Thread(target=lambda: respuestas.append(cronometrar(muchas_rutas)))
+    hilo.start()
+    time.sleep(0.2)
+    matar_procesos_trabajo()
+    hilo.join()
+    codigo, contenido, segundos = respuestas[0]
+    comprobaciones.comprobar((codigo == 200 or codigo == 503 and contenido.get('error'))
+                             and segundos < servicio.tiempo_espera / 2,
+                             f"en vuelo: respuesta inmediata con 503 y mensaje ({codigo}, {segundos:.1f} s)")
+    codigo, _, segundos = cronometrar(una_ruta)
+    comprobaciones.comprobar(codigo == 200, f"en vuelo: la siguiente solicitud se atiende ({codigo}, {segundos:.1f} s)")
+    codigo, contenido = salud()
+    comprobaciones.comprobar(codigo == 200 and contenido.get('estado') == 'recuperado'
+                             and contenido.get('reinicios_pool', 0) >= 2,
+                             f"/salud informa de los reinicios del pool ({contenido.get('reinicios_pool')})")
+
+    # Espera agotada: 504 con mensaje
+    tiempo_espera, servicio.tiempo_espera = servicio.tiempo_espera, 0.001
+    try:
+        codigo, contenido, _ = cronometrar(muchas_rutas)
+    finally:
+        servicio.tiempo_espera = tiempo_espera
+    comprobaciones.comprobar(codigo == 504 and bool(contenido.get('error')),
+                             f"espera agotada: 504 con mensaje ({codigo})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprobaciones de extremo a extremo en la máquina local")
+    parser.add_argument('carpeta')
+    parser.add_argument('--particiones', type=int, default=3, help="Procesos de nodo de la ejecución particionada")
+    parser.add_argument('--perfil', default='rapido', help="Perfil del pipeline")
+    parser.add_argument('--imagenes', type=int, default=None, help="Número máximo de imágenes de la carpeta")
+    parser.add_argument('--concurrencia', type=int, default=16, help="Hilos que envían solicitudes al servicio")
+    parser.add_argument('--repeticiones', type=int, default=4, help="Veces que se envía cada solicitud")
+    args = parser.parse_args()
+
+    rutas = sorted(os.path.abspath(os.path.join(args.carpeta, f)) for f in os.listdir(args.carpeta)
+                   if f.lower().endswith(EXTENSIONES_IMAGEN))[:args.imagenes]
+    if not rutas:
+        print(f"No hay imágenes en {args.carpeta}")
+        return
+
+    comprobaciones = Comprobaciones()
+    comprobar_particiones(rutas, args.particiones, args.perfil, comprobaciones)
+    comprobar_servicio(rutas, args.perfil, args.concurrencia, args.repeticiones, comprobaciones)
+
+    print("Todas las comprobaciones superadas" if not comprobaciones.fallos
+          else f"{comprobaciones.fallos} comprobaciones fallidas")
+    if comprobaciones.fallos:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark de la ruta rápida de puntuación.
+
+Para cada imagen de una carpeta compara:
+    - la latencia de procesar_imagen_completa (carga, detección, filtros y simetría),
+    - la latencia de la ruta rápida (cargar_gris_reducida + puntuar_rapido), a
+      una sola escala y en modo pirámide,
+    - la diferencia entre la puntuación rápida y la puntuación de referencia,
+      ambas con la normalización de pose del perfil por defecto,
+    - la estabilidad de cada modo: cuánto cambia la puntuación de la misma cara
+      al añadir ruido gaussiano a la imagen.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.puntuacion img --reduccion 2 --repeticiones 3
+"""
+import io
+import os
+import time
+import argparse
+import statistics
+from contextlib import redirect_stdout
+import numpy as np
+from configuracion import EXTENSIONES_IMAGEN, NIVELES_PIRAMIDE, PESOS_PIRAMIDE
+from procesamiento_imagenes import ProcesadorImagenes
+
+
+def medir(funcion, repeticiones):
+    """
+    Ejecuta la función varias veces y devuelve su resultado y la mediana en milisegundos.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return resultado, statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la ruta rápida de puntuación")
+    parser.add_argument('carpeta')
+    parser.add_argument('--reduccion', type=int, default=2, choices=[1, 2, 4, 8])
+    parser.add_argument('--niveles', type=int, default=NIVELES_PIRAMIDE, choices=range(1, len(PESOS_PIRAMIDE) + 1),
+                        help="Niveles del modo pirámide")
+    parser.add_argument('--ruido', type=float, default=8.0, help="Desviación del ruido para medir la estabilidad")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    rutas = sorted(os.path.join(args.carpeta, f) for f in os.listdir(args.carpeta)
+                   if f.lower().endswith(EXTENSIONES_IMAGEN))
+    if not rutas:
+        print(f"No hay imágenes en {args.carpeta}")
+        return
+    procesador = ProcesadorImagenes()
+    procesador.precargar()
+    generador = np.random.default_rng(0)
+    # Las dos rutas deben enderezar (o no) las caras igual para que la
+    # diferencia de puntuación compare solo la resolución de trabajo
+    normalizar_pose = procesador.perfil['puntuacion'].get('normalizar_pose', False)
+
+    tiempos = {'completo': [], 'rapido': [], 'piramide': []}
+    diferencias = []
+    variacion = {'rapido': [], 'piramide': []}
+    misma_deteccion = 0
+    for ruta in rutas:
+        # procesar_imagen_completa informa por consola de las imágenes sin cara
+        with redirect_stdout(io.StringIO()):
+            completo, ms = medir(lambda: procesador.procesar_imagen_completa(ruta), args.repeticiones)
+        tiempos['completo'].append(ms)
+        rapido, ms = medir(lambda: procesador.puntuar_rapido(
+            procesador.cargar_gris_reducida(ruta, args.reduccion), args.reduccion,
+            normalizar_pose=normalizar_pose), args.repeticiones)
+        tiempos['rapido'].append(ms)
+        _, ms = medir(lambda: procesador.puntuar_rapido(
+            procesador.cargar_gris_reducida(ruta, args.reduccion), args.reduccion, args.niveles,
+            normalizar_pose=normalizar_pose), args.repeticiones)
+        tiempos['piramide'].append(ms)
+
+        diferencias.append(abs(completo['puntuacion_simetria'] - rapido['puntuacion_simetria']))
+        misma_deteccion += (completo['caja'] is None) == (rapido['caja'] is None)
+
+        # Estabilidad: misma región, con y sin ruido
+        gris = procesador.cargar_gris_reducida(ruta, args.reduccion)
+        ruidosa = np.clip(gris + generador.normal(0, args.ruido, gris.shape), 0, 255).astype(np.uint8)
+        caja = [v // args.reduccion for v in rapido['caja']] if rapido['caja'] is not None else None
+        region, region_ruidosa = procesador.region_cara(gris, caja), procesador.region_cara(ruidosa, caja)
+        variacion['rapido'].append(abs(procesador.puntuacion_espejo(region) -
+                                       procesador.puntuacion_espejo(region_ruidosa)))
+        variacion['piramide'].append(abs(procesador.analizar_simetria_piramide(region, args.niveles)[0] -
+                                         procesador.analizar_simetria_piramide(region_ruidosa, args.niveles)[0]))
+
+    mediana_completo = statistics.median(tiempos['completo'])
+    print(f"{len(rutas)} imágenes, reducción {args.reduccion}, normalización de pose "
+          f"{'activa' if normalizar_pose else 'desactivada'}, mediana por imagen:")
+    print(f"  procesar_imagen_completa  {mediana_completo:8.2f} ms")
+    for modo, nombre in (('rapido', 'puntuar_rapido'), ('piramide', f'puntuar_rapido ({args.niveles} niveles)')):
+        mediana = statistics.median(tiempos[modo])
+        print(f"  {nombre:<26}{mediana:8.2f} ms  (x{mediana_completo / mediana:.1f}), "
+              f"variación media con ruido {statistics.mean(variacion[modo]):.2f} puntos")
+    print(f"Diferencia de puntuación (una escala): media {statistics.mean(diferencias):.2f}, "
+          f"máxima {max(diferencias):.2f} puntos")
+    print(f"Misma decisión de cara detectada: {misma_deteccion}/{len(rutas)}")
+
+
+if __name__ == "__main__":
+    main()
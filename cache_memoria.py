@@ -0,0 +1,122 @@
+"""
+Caché LRU en memoria con un presupuesto en bytes, para los resultados procesados
+y las imágenes de Tk que mantiene la interfaz.
+Este módulo no importa NumPy ni Tkinter: el tamaño de cada valor se mide por sus
+atributos (nbytes de los arrays, ancho y alto de las imágenes de Tk).
+"""
+import sys
+from collections import OrderedDict
+
+
+def tamano_bytes(valor):
+    """
+    Estima los bytes que ocupa un valor en memoria.
+
+    Args:
+        valor: Array de NumPy, imagen de Tk o PIL, cadena, bytes, o un
+            diccionario, lista o tupla de estos.
+
+    Returns:
+        int: Tamaño en bytes.
+    """
+    if valor is None:
+        return 0
+    if hasattr(valor, 'nbytes'):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sum(tamano_bytes(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(tamano_bytes(v) for v in valor)
+    if callable(getattr(valor, 'width', None)) and callable(getattr(valor, 'height', None)):
+        # ImageTk.PhotoImage / tk.PhotoImage: Tk guarda 4 bytes por píxel
+        return valor.width() * valor.height() * 4
+    if hasattr(valor, 'size') and hasattr(valor, 'getbands'):
+        # PIL.Image
+        return valor.size[0] * valor.size[1] * len(valor.getbands())
+    return sys.getsizeof(valor)
+
+
+class CacheMemoria:
+    """
+    Caché LRU acotada por bytes: al superar el presupuesto se expulsan las
+    entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, presupuesto_bytes, al_expulsar=None):
+        """
+        Args:
+            presupuesto_bytes (int): Bytes máximos que pueden ocupar las entradas.
+            al_expulsar (callable): Función opcional llamada con (clave, valor) al
+                expulsar una entrada, por ejemplo para soltar la imagen de un widget.
+        """
+        self.presupuesto_bytes = presupuesto_bytes
+        self.al_expulsar = al_expulsar
+        self.bytes = 0
+        self._entradas = OrderedDict()
+
+    def __contains__(self, clave):
+        return clave in self._entradas
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave):
+        """
+        Devuelve el valor de una clave y la marca como usada recientemente.
+
+        Returns:
+            El valor guardado, o None si no está en la caché.
+        """
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada[0]
+
+    def cabe(self, tamano):
+        """
+        Indica si una entrada de ese tamaño cabe sin expulsar ninguna otra.
+        """
+        return self.bytes + tamano <= self.presupuesto_bytes
+
+    def guardar(self, clave, valor, tamano=None):
+        """
+        Guarda un valor y expulsa las entradas menos recientes hasta volver al
+        presupuesto. Un valor mayor que todo el presupuesto no se guarda.
+
+        Args:
+            clave: Clave de la entrada.
+            valor: Valor a guardar.
+            tamano (int): Bytes del valor (por defecto, los que mide tamano_bytes).
+
+        Returns:
+            bool: True si el valor quedó guardado.
+        """
+        if tamano is None:
+            tamano = tamano_bytes(valor)
+        self.eliminar(clave)
+        if tamano > self.presupuesto_bytes:
+            return False
+        self._entradas[clave] = (valor, tamano)
+        self.bytes += tamano
+        while self.bytes > self.presupuesto_bytes:
+            antigua, (valor_antiguo, tamano_antiguo) = self._entradas.popitem(last=False)
+            self.bytes -= tamano_antiguo
+            if self.al_expulsar is not None:
+                self.al_expulsar(antigua, valor_antiguo)
+        return True
+
+    def eliminar(self, clave):
+        """
+        Elimina una entrada sin llamar a al_expulsar.
+        """
+        entrada = self._entradas.pop(clave, None)
+        if entrada is not None:
+            self.bytes -= entrada[1]
+
+    def limpiar(self):
+        """
+        Vacía la caché sin llamar a al_expulsar.
+        """
+        self._entradas.clear()
+        self.bytes = 0
@@ -0,0 +1,39 @@
+"""
+Constantes y utilidades de configuración compartidas por la interfaz y el procesamiento.
+Este módulo no importa OpenCV ni NumPy, para que la interfaz pueda usarlo
+sin retrasar su arranque.
+"""
+
+# Extensiones de archivo que se consideran imágenes al explorar carpetas
+EXTENSIONES_IMAGEN = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+# Versión del pipeline; cambiarla invalida los resultados guardados en el índice
+VERSION_PIPELINE = "1"
+
+# Niveles de la pirámide gaussiana y peso de cada uno (del más fino al más grueso):
+# los niveles gruesos, más robustos frente al ruido y al pelaje, pesan más
+NIVELES_PIRAMIDE = 4
+PESOS_PIRAMIDE = (0.1, 0.2, 0.3, 0.4)
+
+# Presupuestos de memoria de la interfaz (bytes): resultados procesados de las
+# imágenes analizadas e imágenes de Tk de las miniaturas
+MEMORIA_RESULTADOS = 128 * 1024 * 1024
+MEMORIA_MINIATURAS = 64 * 1024 * 1024
+
+
+def clasificar_puntuacion(puntuacion):
+    """
+    Determina el color y el mensaje asociados a una puntuación de simetría.
+
+    Args:
+        puntuacion (float): Puntuación de simetría en porcentaje.
+
+    Returns:
+        tuple: (color, mensaje)
+    """
+    if puntuacion >= 80:
+        return '#28a745', 'Alta simetría'  # Verde más suave
+    elif puntuacion >= 60:
+        return '#ffc107', 'Simetría media'  # Amarillo más suave
+    else:
+        return '#dc3545', 'Baja simetría'  # Rojo más suave
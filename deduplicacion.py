@@ -0,0 +1,264 @@
+import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from PIL import Image
+from configuracion import EXTENSIONES_IMAGEN
+
+# Distancia de Hamming máxima (sobre 64 bits) para considerar dos imágenes casi idénticas
+UMBRAL_DEFECTO = 6
+
+
+def calcular_hash(ruta_imagen, tipo='dhash'):
+    """
+    Calcula el hash perceptual de 64 bits de una imagen a partir de una
+    decodificación reducida en escala de grises (1/8 del tamaño original).
+
+    Args:
+        ruta_imagen (str): Ruta de la imagen.
+        tipo (str): 'dhash' (gradiente horizontal) o 'phash' (DCT).
+
+    Returns:
+        int: Hash perceptual de 64 bits.
+    """
+    gris = cv2.imread(ruta_imagen, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gris is None:
+        raise ValueError(f"No se pudo cargar la imagen desde {ruta_imagen}")
+    return hash_desde_gris(gris, tipo)
+
+
+def hash_desde_gris(gris, tipo='dhash'):
+    """
+    Calcula el hash perceptual de 64 bits de una imagen en escala de grises.
+
+    Args:
+        gris (numpy.ndarray): Imagen en escala de grises.
+        tipo (str): 'dhash' o 'phash'.
+
+    Returns:
+        int: Hash perceptual de 64 bits.
+    """
+    if tipo == 'dhash':
+        # Comparar cada píxel con su vecino derecho en una imagen de 9x8
+        reducida = cv2.resize(gris, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = reducida[:, 1:] > reducida[:, :-1]
+    elif tipo == 'phash':
+        # Coeficientes de baja frecuencia de la DCT comparados con su mediana
+        reducida = cv2.resize(gris, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+        dct = cv2.dct(reducida)[:8, :8]
+        bits = dct > np.median(dct)
+    else:
+        raise ValueError("Tipo de hash no válido. Opciones: 'dhash', 'phash'")
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
+
+
+def distancia_hamming(a, b):
+    """
+    Número de bits distintos entre dos hashes.
+    """
+    return bin(a ^ b).count('1')
+
+
+def calcular_hashes(rutas, tipo='dhash', hilos=None):
+    """
+    Calcula los hashes de varias imágenes en paralelo (OpenCV libera el GIL).
+
+    Args:
+        rutas (list): Rutas de las imágenes.
+        tipo (str): 'dhash' o 'phash'.
+        hilos (int): Número de hilos (por defecto, uno por núcleo).
+
+    Returns:
+        dict: Diccionario {ruta: hash}. Las imágenes ilegibles se omiten.
+    """
+    def calcular(ruta):
+        try:
+            return ruta, calcular_hash(ruta, tipo)
+        except ValueError:
+            return ruta, None
+
+    with ThreadPoolExecutor(max_workers=hilos or os.cpu_count() or 1) as pool:
+        return {ruta: h for ruta, h in pool.map(calcular, rutas) if h is not None}
+
+
+class ArbolBK:
+    """
+    Árbol BK sobre la distancia de Hamming: permite encontrar todos los hashes
+    a distancia menor o igual que un radio sin comparar contra todos ellos.
+    """
+
+    def __init__(self):
+        # Cada nodo es [hash, valor, {distancia: nodo_hijo}]
+        self._raiz = None
+        self._tamano = 0
+
+    def __len__(self):
+        return self._tamano
+
+    def insertar(self, valor_hash, valor):
+        """
+        Inserta un hash con su valor asociado.
+        """
+        self._tamano += 1
+        nodo_nuevo = [valor_hash, valor, {}]
+        if self._raiz is None:
+            self._raiz = nodo_nuevo
+            return
+        nodo = self._raiz
+        while True:
+            distancia = distancia_hamming(valor_hash, nodo[0])
+            hijo = nodo[2].get(distancia)
+            if hijo is None:
+                nodo[2][distancia] = nodo_nuevo
+                return
+            nodo = hijo
+
+    def buscar(self, valor_hash, radio):
+        """
+        Busca los valores cuyo hash está a distancia menor o igual que el radio.
+
+        Returns:
+            list: Lista de tuplas (distancia, valor) ordenada por distancia.
+        """
+        encontrados = []
+        pendientes = [self._raiz] if self._raiz is not None else []
+        while pendientes:
+            nodo = pendientes.pop()
+            distancia = distancia_hamming(valor_hash, nodo[0])
+            if distancia <= radio:
+                encontrados.append((distancia, nodo[1]))
+            # Por la desigualdad triangular, solo los hijos en [d - radio, d + radio] pueden coincidir
+            for distancia_hijo, hijo in nodo[2].items():
+                if distancia - radio <= distancia_hijo <= distancia + radio:
+                    pendientes.append(hijo)
+        encontrados.sort(key=lambda e: e[0])
+        return encontrados
+
+
+def agrupar_duplicados(hashes, umbral=UMBRAL_DEFECTO):
+    """
+    Agrupa las imágenes casi idénticas. Cada imagen se asigna al representante
+    más cercano dentro del umbral o, si no hay ninguno, pasa a ser representante.
+
+    Args:
+        hashes (dict): Diccionario {ruta: hash}, en el orden de exploración.
+        umbral (int): Distancia de Hamming máxima dentro de un grupo.
+
+    Returns:
+        dict: Diccionario {representante: [miembros]}, donde los miembros
+            incluyen al propio representante en primer lugar.
+    """
+    arbol = ArbolBK()
+    grupos = {}
+    for ruta, valor_hash in hashes.items():
+        cercanos = arbol.buscar(valor_hash, umbral)
+        if cercanos:
+            grupos[cercanos[0][1]].append(ruta)
+        else:
+            arbol.insertar(valor_hash, ruta)
+            grupos[ruta] = [ruta]
+    return grupos
+
+
+def escanear_directorio(carpeta, umbral=UMBRAL_DEFECTO, tipo='dhash'):
+    """
+    Explora una carpeta, calcula el hash de cada imagen y agrupa los casi duplicados.
+
+    Args:
+        carpeta (str): Carpeta de imágenes.
+        umbral (int): Distancia de Hamming máxima dentro de un grupo.
+        tipo (str): 'dhash' o 'phash'.
+
+    Returns:
+        dict: Diccionario {representante: [miembros]}.
+    """
+    rutas = sorted(os.path.join(carpeta, f) for f in os.listdir(carpeta)
+                   if f.lower().endswith(EXTENSIONES_IMAGEN))
+    return agrupar_duplicados(calcular_hashes(rutas, tipo), umbral)
+
+
+def tamano_imagen(ruta_imagen):
+    """
+    Lee el tamaño (ancho, alto) de una imagen desde su cabecera, sin decodificarla.
+
+    Returns:
+        tuple: (ancho, alto), o None si no se puede leer.
+    """
+    try:
+        with Image.open(ruta_imagen) as imagen:
+            return imagen.size
+    except (OSError, ValueError):
+        return None
+
+
+def heredar_resultado(resultado, representante, miembro):
+    """
+    Adapta el resultado del representante a un casi duplicado. Las cajas se
+    escalan a la resolución del miembro (una copia redimensionada tiene las
+    caras en otras coordenadas); si no se puede leer el tamaño de alguna de las
+    dos imágenes, se descartan. El resultado se marca con 'heredado_de'.
+
+    Args:
+        resultado (dict): Resultado del representante.
+        representante (str): Ruta del representante.
+        miembro (str): Ruta del casi duplicado.
+
+    Returns:
+        dict: Copia del resultado para el miembro.
+    """
+    heredado = dict(resultado, heredado_de=representante)
+    tamano_origen, tamano_destino = tamano_imagen(representante), tamano_imagen(miembro)
+    if tamano_origen is None or tamano_destino is None:
+        heredado['caja'] = None
+        heredado['caras'] = []
+        return heredado
+
+    escala_x = tamano_destino[0] / tamano_origen[0]
+    escala_y = tamano_destino[1] / tamano_origen[1]
+
+    def escalar(caja):
+        if caja is None:
+            return None
+        x, y, w, h = caja
+        return [round(x * escala_x), round(y * escala_y), round(w * escala_x), round(h * escala_y)]
+
+    heredado['caja'] = escalar(resultado.get('caja'))
+    heredado['caras'] = [dict(cara, caja=escalar(cara['caja'])) for cara in resultado.get('caras', [])]
+    return heredado
+
+
+def heredar_resultados(grupos, resultados_representantes):
+    """
+    Propaga el resultado de cada representante a todos los miembros de su grupo
+    (ver heredar_resultado). El representante conserva su propio resultado.
+
+    Args:
+        grupos (dict): Diccionario {representante: [miembros]}.
+        resultados_representantes (dict): Diccionario {representante: resultado}.
+
+    Returns:
+        dict: Diccionario {ruta: resultado} para todas las imágenes agrupadas.
+    """
+    return {miembro: resultado if miembro == representante else heredar_resultado(resultado, representante, miembro)
+            for representante, resultado in resultados_representantes.items()
+            for miembro in grupos.get(representante, [representante])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detección de imágenes casi duplicadas mediante hash perceptual")
+    parser.add_argument('carpeta')
+    parser.add_argument('--umbral', type=int, default=UMBRAL_DEFECTO)
+    parser.add_argument('--tipo', choices=['dhash', 'phash'], default='dhash')
+    args = parser.parse_args()
+
+    grupos = escanear_directorio(args.carpeta, args.umbral, args.tipo)
+    total = sum(len(m) for m in grupos.values())
+    for representante, miembros in grupos.items():
+        if len(miembros) > 1:
+            print(f"{representante}: {', '.join(os.path.basename(m) for m in miembros[1:])}")
+    print(f"{total} imágenes, {len(grupos)} representantes ({total - len(grupos)} duplicados)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import argparse
+import threading
+import cv2
+import numpy as np
+
+# Carpeta para modelos locales que no incluye OpenCV (cascada LBP, redes DNN)
+DIR_MODELOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modelos")
+
+DETECTOR_DEFECTO = 'haar'
+
+
+class DetectorCaras:
+    """
+    Interfaz común de los detectores de caras de gatos. Cada detector carga su
+    modelo de forma diferida y devuelve cajas (x, y, w, h) en píxeles.
+    """
+
+    nombre = 'base'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cargado = False
+
+    def cargar(self):
+        """
+        Carga el modelo si aún no está cargado (seguro entre hilos).
+        """
+        if not self._cargado:
+            with self._lock:
+                if not self._cargado:
+                    self._cargar_modelo()
+                    self._cargado = True
+
+    def _cargar_modelo(self):
+        raise NotImplementedError
+
+    def detectar(self, imagen):
+        """
+        Detecta las caras de gato de una imagen.
+
+        Args:
+            imagen (numpy.ndarray): Imagen en formato BGR o en escala de grises.
+
+        Returns:
+            list: Lista de cajas (x, y, w, h).
+        """
+        raise NotImplementedError
+
+
+class DetectorCascada(DetectorCaras):
+    """
+    Detector basado en un clasificador en cascada de OpenCV (Haar o LBP).
+    """
+
+    def __init__(self, archivo, nombre=None, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)):
+        """
+        Args:
+            archivo (str): Ruta del XML de la cascada, o nombre de un archivo
+                incluido en cv2.data.haarcascades.
+            nombre (str): Nombre del detector (por defecto, el del archivo).
+            scaleFactor (float): Factor de escala entre niveles de búsqueda.
+            minNeighbors (int): Vecinos mínimos para aceptar una detección.
+            minSize (tuple): Tamaño mínimo de cara en píxeles.
+        """
+        super().__init__()
+        self.archivo = archivo
+        self.nombre = nombre or os.path.splitext(os.path.basename(archivo))[0]
+        self.scaleFactor = scaleFactor
+        self.minNeighbors = minNeighbors
+        self.minSize = tuple(minSize)
+        self.clasificador = None
+
+    def _cargar_modelo(self):
+        ruta = self.archivo
+        if not os.path.exists(ruta):
+            ruta = os.path.join(cv2.data.haarcascades, self.archivo)
+        if not os.path.exists(ruta):
+            raise ValueError(f"No se encontró la cascada {self.archivo}")
+        clasificador = cv2.CascadeClassifier(ruta)
+        if clasificador.empty():
+            raise ValueError(f"No se pudo cargar la cascada desde {self.archivo}")
+        self.clasificador = clasificador
+
+    def detectar(self, imagen):
+        self.cargar()
+        if len(imagen.shape) == 3:
+            gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        else:
+            gris = imagen
+        caras = self.clasificador.detectMultiScale(gris, scaleFactor=self.scaleFactor,
+                                                   minNeighbors=self.minNeighbors, minSize=self.minSize)
+        return [tuple(int(v) for v in cara) for cara in caras]
+
+
+class DetectorDNN(DetectorCaras):
+    """
+    Detector basado en una red de detección tipo SSD cargada con cv2.dnn desde
+    un archivo local (Caffe, TensorFlow, ONNX...). La salida esperada tiene
+    forma [1, 1, N, 7] con (imagen, clase, confianza, x1, y1, x2, y2) normalizados.
+    """
+
+    def __init__(self, modelo, config=None, nombre='dnn', tamano_entrada=(300, 300),
+                 media=(104.0, 177.0, 123.0), escala=1.0, intercambiar_rb=False, umbral=0.5, clase=None):
+        """
+        Args:
+            modelo (str): Ruta del archivo de pesos.
+            config (str): Ruta del archivo de configuración, si el formato lo requiere.
+            nombre (str): Nombre del detector.
+            tamano_entrada (tuple): Tamaño (ancho, alto) de la entrada de la red.
+            media (tuple): Media que se resta a cada canal.
+            escala (float): Factor de escala aplicado a los píxeles.
+            intercambiar_rb (bool): Si la red espera RGB en lugar de BGR.
+            umbral (float): Confianza mínima para aceptar una detección.
+            clase (int): Si se indica, solo se aceptan detecciones de esa clase.
+        """
+        super().__init__()
+        self.modelo = modelo
+        self.config = config
+        self.nombre = nombre
+        self.tamano_entrada = tuple(tamano_entrada)
+        self.media = tuple(media)
+        self.escala = escala
+        self.intercambiar_rb = intercambiar_rb
+        self.umbral = umbral
+        self.clase = clase
+        self.red = None
+
+    def _cargar_modelo(self):
+        if not os.path.exists(self.modelo):
+            raise ValueError(f"No se encontró el modelo DNN en {self.modelo}")
+        self.red = cv2.dnn.readNet(self.modelo, self.config or '')
+
+    def detectar(self, imagen):
+        self.cargar()
+        if len(imagen.shape) == 2:
+            imagen = cv2.cvtColor(imagen, cv2.COLOR_GRAY2BGR)
+        altura, ancho = imagen.shape[:2]
+        blob = cv2.dnn.blobFromImage(imagen, self.escala, self.tamano_entrada, self.media,
+                                     swapRB=self.intercambiar_rb, crop=False)
+        # La red no es segura entre hilos: la inferencia se serializa
+        with self._lock:
+            self.red.setInput(blob)
+            salida = self.red.forward()
+
+        caras = []
+        for _, clase, confianza, x1, y1, x2, y2 in salida.reshape(-1, 7):
+            if confianza < self.umbral or (self.clase is not None and int(clase) != self.clase):
+                continue
+            x1, x2 = np.clip([x1 * ancho, x2 * ancho], 0, ancho)
+            y1, y2 = np.clip([y1 * altura, y2 * altura], 0, altura)
+            if x2 > x1 and y2 > y1:
+                caras.append((int(x1), int(y1), int(x2 - x1), int(y2 - y1)))
+        return caras
+
+
+# Detectores incluidos, creados bajo demanda por nombre
+DETECTORES = {
+    'haar': lambda **op: DetectorCascada('haarcascade_frontalcatface.xml', nombre='haar', **op),
+    'haar_extendido': lambda **op: DetectorCascada('haarcascade_frontalcatface_extended.xml',
+                                                   nombre='haar_extendido', **op),
+    'lbp': lambda **op: DetectorCascada(op.pop('archivo', os.path.join(DIR_MODELOS, 'lbpcascade_frontalcatface.xml')),
+                                        nombre='lbp', **op),
+    'dnn': lambda **op: DetectorDNN(op.pop('modelo', os.path.join(DIR_MODELOS, 'detector_gatos.onnx')), **op),
+}
+
+
+def crear_detector(nombre=DETECTOR_DEFECTO, **opciones):
+    """
+    Crea uno de los detectores incluidos.
+
+    Args:
+        nombre (str): 'haar', 'haar_extendido', 'lbp' o 'dnn'.
+        **opciones: Parámetros del detector (p. ej. minNeighbors, archivo, modelo).
+
+    Returns:
+        DetectorCaras: Detector sin cargar (se carga en el primer uso).
+    """
+    if nombre not in DETECTORES:
+        raise ValueError(f"Detector no válido. Opciones: {', '.join(DETECTORES)}")
+    return DETECTORES[nombre](**opciones)
+
+
+def cargar_anotaciones(ruta_json):
+    """
+    Carga un conjunto etiquetado local con el formato
+    {"ruta/imagen.jpg": [[x, y, w, h], ...], ...}. Las rutas relativas se
+    interpretan respecto a la carpeta del archivo JSON.
+
+    Returns:
+        dict: Diccionario {ruta_absoluta: [cajas]}.
+    """
+    base = os.path.dirname(os.path.abspath(ruta_json))
+    with open(ruta_json, encoding='utf-8') as f:
+        anotaciones = json.load(f)
+    return {os.path.join(base, ruta): [tuple(c) for c in cajas] for ruta, cajas in anotaciones.items()}
+
+
+def iou(a, b):
+    """
+    Intersección sobre unión de dos cajas (x, y, w, h).
+    """
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    interseccion = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - interseccion
+    return interseccion / union if union > 0 else 0.0
+
+
+def evaluar_detector(detector, anotaciones, umbral_iou=0.5):
+    """
+    Mide precisión, exhaustividad (recall) y rendimiento de un detector sobre
+    un conjunto etiquetado.
+
+    Args:
+        detector (DetectorCaras): Detector a evaluar.
+        anotaciones (dict): Diccionario {ruta: [cajas reales]}.
+        umbral_iou (float): IoU mínima para contar una detección como acierto.
+
+    Returns:
+        dict: Precisión, recall, verdaderos/falsos positivos, falsos negativos,
+            milisegundos por imagen e imágenes por segundo.
+    """
+    # Decodificar antes de medir para que el tiempo sea solo el de detección
+    imagenes = {ruta: cv2.imread(ruta) for ruta in anotaciones}
+    imagenes = {ruta: img for ruta, img in imagenes.items() if img is not None}
+    if not imagenes:
+        raise ValueError("No se pudo cargar ninguna imagen del conjunto etiquetado")
+    detector.cargar()
+
+    verdaderos, falsos, no_detectadas = 0, 0, 0
+    tiempo = 0.0
+    for ruta, imagen in imagenes.items():
+        inicio = time.perf_counter()
+        detecciones = detector.detectar(imagen)
+        tiempo += time.perf_counter() - inicio
+
+        # Emparejar cada caja real con la mejor detección libre
+        reales = list(anotaciones[ruta])
+        libres = list(detecciones)
+        for real in reales:
+            mejor = max(libres, key=lambda d: iou(real, d), default=None)
+            if mejor is not None and iou(real, mejor) >= umbral_iou:
+                verdaderos += 1
+                libres.remove(mejor)
+            else:
+                no_detectadas += 1
+        falsos += len(libres)
+
+    return {
+        'detector': detector.nombre,
+        'precision': verdaderos / (verdaderos + falsos) if verdaderos + falsos else 0.0,
+        'recall': verdaderos / (verdaderos + no_detectadas) if verdaderos + no_detectadas else 0.0,
+        'verdaderos_positivos': verdaderos,
+        'falsos_positivos': falsos,
+        'falsos_negativos': no_detectadas,
+        'ms_por_imagen': tiempo * 1000 / len(imagenes),
+        'imagenes_por_segundo': len(imagenes) / tiempo if tiempo > 0 else float('inf')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluación de detectores de caras de gatos")
+    parser.add_argument('anotaciones', help="JSON con {ruta: [[x, y, w, h], ...]}")
+    parser.add_argument('--detectores', nargs='+', default=['haar', 'haar_extendido'], choices=list(DETECTORES))
+    parser.add_argument('--lbp', default=None, help="Ruta de la cascada LBP")
+    parser.add_argument('--dnn-modelo', default=None, help="Ruta del modelo DNN")
+    parser.add_argument('--dnn-config', default=None, help="Ruta de la configuración del modelo DNN")
+    parser.add_argument('--umbral-iou', type=float, default=0.5)
+    args = parser.parse_args()
+
+    anotaciones = cargar_anotaciones(args.anotaciones)
+    print(f"{'Detector':<16}{'Precisión':>10}{'Recall':>10}{'ms/img':>10}{'img/s':>10}")
+    for nombre in args.detectores:
+        opciones = {}
+        if nombre == 'lbp' and args.lbp:
+            opciones['archivo'] = args.lbp
+        if nombre == 'dnn':
+            if args.dnn_modelo:
+                opciones['modelo'] = args.dnn_modelo
+            opciones['config'] = args.dnn_config
+        try:
+            r = evaluar_detector(crear_detector(nombre, **opciones), anotaciones, args.umbral_iou)
+        except ValueError as e:
+            print(f"{nombre:<16}{str(e)}")
+            continue
+        print(f"{r['detector']:<16}{r['precision']:>10.3f}{r['recall']:>10.3f}"
+              f"{r['ms_por_imagen']:>10.1f}{r['imagenes_por_segundo']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
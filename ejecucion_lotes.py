@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import FIRST_COMPLETED, wait
+from configuracion import EXTENSIONES_IMAGEN, VERSION_PIPELINE
+from deduplicacion import calcular_hashes, agrupar_duplicados, heredar_resultados
+from perfiles import PERFIL_DEFECTO, RUTA_PERFILES_DEFECTO, cargar_perfiles, obtener_perfil, metrica_perfil
+from procesamiento_lotes import crear_pool, puntuar_elementos
+
+# Archivo con los parámetros de la ejecución, compartido por todas las particiones
+ARCHIVO_EJECUCION = "ejecucion.json"
+
+
+def asignar_particion(ruta, num_particiones):
+    """
+    Asigna de forma determinista una ruta a una partición según el hash de la ruta,
+    de modo que cualquier máquina calcula el mismo reparto sin coordinarse.
+
+    Args:
+        ruta (str): Ruta de la imagen, tal como aparece en la lista de entrada.
+        num_particiones (int): Número total de particiones.
+
+    Returns:
+        int: Índice de la partición (0 .. num_particiones - 1).
+    """
+    resumen = hashlib.sha1(ruta.encode('utf-8')).hexdigest()
+    return int(resumen[:16], 16) % num_particiones
+
+
+def leer_entrada(entrada):
+    """
+    Lee la lista de imágenes de entrada: un archivo de texto con una ruta por
+    línea, o una carpeta (se exploran sus imágenes en orden).
+
+    Returns:
+        list: Rutas de las imágenes.
+    """
+    if os.path.isdir(entrada):
+        return sorted(os.path.join(entrada, f) for f in os.listdir(entrada)
+                      if f.lower().endswith(EXTENSIONES_IMAGEN))
+    with open(entrada, encoding='utf-8') as f:
+        return [linea.strip() for linea in f if linea.strip()]
+
+
+def ruta_punto_control(dir_salida, particion, num_particiones):
+    """
+    Ruta del archivo de punto de control (JSONL) de una partición.
+    """
+    return os.path.join(dir_salida, f"particion_{particion:04d}_de_{num_particiones:04d}.jsonl")
+
+
+def leer_punto_control(ruta, recortar=False):
+    """
+    Lee el punto de control de una partición. Solo cuentan las líneas
+    completas (terminadas en salto de línea): si el proceso se interrumpió a
+    mitad de una escritura, la última línea incompleta se descarta aunque sea
+    JSON válido. La lectura no modifica el archivo salvo que se pida recortar.
+
+    Args:
+        ruta (str): Ruta del archivo de punto de control.
+        recortar (bool): Si se debe recortar del archivo la línea incompleta
+            para poder seguir añadiendo. Solo debe hacerlo la partición dueña
+            del archivo.
+
+    Returns:
+        dict: Diccionario {ruta_imagen: registro} de los elementos completados.
+    """
+    completados = {}
+    if not os.path.exists(ruta):
+        return completados
+
+    valido = 0
+    with open(ruta, 'rb') as f:
+        for linea in f:
+            if not linea.endswith(b'\n'):
+                break
+            try:
+                registro = json.loads(linea)
+                completados[registro['ruta']] = registro
+            except (ValueError, KeyError, TypeError):
+                break
+            valido += len(linea)
+
+    if recortar and valido < os.path.getsize(ruta):
+        with open(ruta, 'r+b') as f:
+            f.truncate(valido)
+    return completados
+
+
+def _preparar_directorio(dir_salida, num_particiones, perfil):
+    """
+    Crea la carpeta de salida y comprueba que los parámetros coinciden con los
+    de la ejecución que se está reanudando.
+    """
+    os.makedirs(dir_salida, exist_ok=True)
+    parametros = {'num_particiones': num_particiones, 'version_pipeline': VERSION_PIPELINE,
+                  'perfil': perfil['nombre'], 'metrica': metrica_perfil(perfil)}
+    ruta = os.path.join(dir_salida, ARCHIVO_EJECUCION)
+    if os.path.exists(ruta):
+        with open(ruta, encoding='utf-8') as f:
+            existentes = json.load(f)
+        if existentes != parametros:
+            raise ValueError(f"La carpeta {dir_salida} pertenece a otra ejecución: {existentes}")
+        return
+    # Escritura atómica: varios nodos pueden crear el mismo archivo a la vez
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(parametros, f)
+    os.replace(temporal, ruta)
+
+
+def ejecutar_particion(rutas, particion, num_particiones, dir_salida, num_procesos=None,
+                       tamano_lote=8, reintentar_errores=False, deduplicar=False,
+                       perfil=PERFIL_DEFECTO, ruta_perfiles=RUTA_PERFILES_DEFECTO):
+    """
+    Procesa la partición indicada de la lista de imágenes, guardando cada lote
+    completado en su punto de control. Si se vuelve a ejecutar, continúa
+    exactamente donde se detuvo.
+
+    Args:
+        rutas (list): Lista completa de imágenes (igual en todos los nodos).
+        particion (int): Partición que procesa este nodo.
+        num_particiones (int): Número total de particiones.
+        dir_salida (str): Carpeta compartida de salida.
+        num_procesos (int): Procesos de trabajo (por defecto, uno por núcleo).
+        tamano_lote (int): Imágenes por tarea.
+        reintentar_errores (bool): Si es True, vuelve a procesar las imágenes que fallaron.
+        deduplicar (bool): Si es True, agrupa los casi duplicados de la partición
+            y solo procesa un representante por grupo.
+        perfil (str): Perfil del pipeline con el que se puntúa.
+        ruta_perfiles (str): Archivo JSON de perfiles.
+
+    Returns:
+        dict: Número de imágenes de la partición, ya completadas y procesadas ahora.
+    """
+    if not 0 <= particion < num_particiones:
+        raise ValueError(f"Partición fuera de rango: {particion} (hay {num_particiones})")
+    perfiles = cargar_perfiles(ruta_perfiles)
+    _preparar_directorio(dir_salida, num_particiones, obtener_perfil(perfil, perfiles))
+
+    propias = [r for r in rutas if asignar_particion(r, num_particiones) == particion]
+    ruta_control = ruta_punto_control(dir_salida, particion, num_particiones)
+    completados = leer_punto_control(ruta_control, recortar=True)
+    pendientes = [r for r in propias
+                  if r not in completados or (reintentar_errores and 'error' in completados[r])]
+    resumen = {'particion': particion, 'total': len(propias),
+               'ya_completadas': len(propias) - len(pendientes), 'procesadas': 0}
+    if not pendientes:
+        return resumen
+
+    num_procesos = num_procesos or os.cpu_count() or 1
+    with crear_pool(num_procesos, perfil=perfil, perfiles=perfiles) as pool, open(ruta_control, 'a', encoding='utf-8') as control:
+        grupos = {r: [r] for r in pendientes}
+        if deduplicar:
+            # Los duplicados solo se agrupan dentro de la partición
+            hashes = calcular_hashes(pendientes)
+            grupos = agrupar_duplicados(hashes)
+            grupos.update({r: [r] for r in pendientes if r not in hashes})
+
+        representantes = list(grupos)
+        lotes = iter([representantes[i:i + tamano_lote] for i in range(0, len(representantes), tamano_lote)])
+        en_vuelo = {}
+
+        def enviar_siguiente():
+            lote = next(lotes, None)
+            if lote is not None:
+                en_vuelo[pool.submit(puntuar_elementos, [{'ruta': r} for r in lote])] = lote
+
+        # Mantener un número acotado de lotes en vuelo
+        for _ in range(2 * num_procesos):
+            enviar_siguiente()
+
+        while en_vuelo:
+            terminados, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                lote = en_vuelo.pop(futuro)
+                resultados = futuro.result()
+                for ruta, resultado in zip(lote, resultados):
+                    if 'error' in resultado:
+                        registros = [{'ruta': miembro, 'error': resultado['error']} for miembro in grupos[ruta]]
+                    else:
+                        # Las cajas de los duplicados se escalan a su propia resolución
+                        heredados = heredar_resultados({ruta: grupos[ruta]}, {ruta: resultado})
+                        registros = [{'ruta': miembro, 'resultado': r} for miembro, r in heredados.items()]
+                        for registro in registros:
+                            if registro['ruta'] != ruta:
+                                registro['representante'] = ruta
+                    for registro in registros:
+                        control.write(json.dumps(registro) + '\n')
+                        resumen['procesadas'] += 1
+                # El lote solo cuenta como completado cuando está en disco
+                control.flush()
+                os.fsync(control.fileno())
+                enviar_siguiente()
+
+    return resumen
+
+
+def combinar_particiones(dir_salida, num_particiones, destino, ruta_indice=None):
+    """
+    Combina los puntos de control de todas las particiones en un único archivo
+    JSONL ordenado por ruta y, opcionalmente, los registra en el índice de resultados
+    bajo la métrica del perfil con el que se ejecutaron.
+
+    Args:
+        dir_salida (str): Carpeta compartida de salida.
+        num_particiones (int): Número total de particiones.
+        destino (str): Archivo JSONL combinado.
+        ruta_indice (str): Si se indica, base de datos del índice de resultados.
+
+    Returns:
+        dict: Número de registros, errores y particiones que faltan.
+    """
+    registros = {}
+    faltan = []
+    for particion in range(num_particiones):
+        ruta = ruta_punto_control(dir_salida, particion, num_particiones)
+        if not os.path.exists(ruta):
+            faltan.append(particion)
+            continue
+        registros.update(leer_punto_control(ruta))
+
+    with open(destino, 'w', encoding='utf-8') as f:
+        for ruta in sorted(registros):
+            f.write(json.dumps(registros[ruta]) + '\n')
+
+    validos = [(r, reg['resultado']) for r, reg in registros.items() if 'resultado' in reg]
+    if ruta_indice is not None:
+        from indice_resultados import IndiceResultados
+        with open(os.path.join(dir_salida, ARCHIVO_EJECUCION), encoding='utf-8') as f:
+            metrica = json.load(f)['metrica']
+        indice = IndiceResultados(ruta_indice)
+        indice.registrar_lote(validos, metrica=metrica)
+        indice.cerrar()
+
+    return {'registros': len(registros), 'errores': len(registros) - len(validos), 'particiones_faltantes': faltan}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecución por lotes particionada y reanudable")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_ejecutar = subparsers.add_parser('ejecutar', help="Procesa una partición")
+    p_ejecutar.add_argument('entrada', help="Archivo con una ruta por línea, o carpeta de imágenes")
+    p_ejecutar.add_argument('salida', help="Carpeta compartida de salida")
+    p_ejecutar.add_argument('--particion', type=int, required=True)
+    p_ejecutar.add_argument('--num-particiones', type=int, required=True)
+    p_ejecutar.add_argument('--procesos', type=int, default=None)
+    p_ejecutar.add_argument('--tamano-lote', type=int, default=8)
+    p_ejecutar.add_argument('--reintentar-errores', action='store_true')
+    p_ejecutar.add_argument('--deduplicar', action='store_true')
+    p_ejecutar.add_argument('--perfil', default=PERFIL_DEFECTO, help="Perfil del pipeline")
+    p_ejecutar.add_argument('--perfiles', default=RUTA_PERFILES_DEFECTO, help="Archivo JSON de perfiles")
+
+    p_combinar = subparsers.add_parser('combinar', help="Combina las salidas de todas las particiones")
+    p_combinar.add_argument('salida', help="Carpeta compartida de salida")
+    p_combinar.add_argument('destino', help="Archivo JSONL combinado")
+    p_combinar.add_argument('--num-particiones', type=int, required=True)
+    p_combinar.add_argument('--indice', default=None, help="Base de datos del índice de resultados")
+
+    args = parser.parse_args()
+    if args.comando == 'ejecutar':
+        resumen = ejecutar_particion(leer_entrada(args.entrada), args.particion, args.num_particiones,
+                                     args.salida, args.procesos, args.tamano_lote,
+                                     args.reintentar_errores, args.deduplicar, args.perfil, args.perfiles)
+        print(f"Partición {resumen['particion']}: {resumen['total']} imágenes, "
+              f"{resumen['ya_completadas']} ya completadas, {resumen['procesadas']} procesadas ahora")
+    else:
+        resumen = combinar_particiones(args.salida, args.num_particiones, args.destino, args.indice)
+        print(f"{resumen['registros']} registros combinados ({resumen['errores']} errores)")
+        if resumen['particiones_faltantes']:
+            print(f"Faltan las particiones: {resumen['particiones_faltantes']}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import os
+import html
+import argparse
+from collections import deque
+import cv2
+import numpy as np
+from configuracion import EXTENSIONES_IMAGEN, clasificar_puntuacion
+from perfiles import PERFIL_DEFECTO, RUTA_PERFILES_DEFECTO, cargar_perfiles
+from procesamiento_lotes import crear_pool, obtener_procesador
+
+# Alto de la banda inferior de cada celda con el nombre y la puntuación
+ALTO_BANDA = 36
+
+
+def color_bgr(color_hex):
+    """
+    Convierte un color '#rrggbb' al formato BGR de OpenCV.
+    """
+    color_hex = color_hex.lstrip('#')
+    return tuple(int(color_hex[i:i + 2], 16) for i in (4, 2, 0))
+
+
+def preparar_celda(ruta_imagen, tamano_celda=256):
+    """
+    Compone la celda de una imagen para la hoja de contactos: la cara recortada
+    con su línea de simetría y una banda con el nombre y la puntuación. Se
+    ejecuta en los procesos de trabajo y puntúa con el perfil del proceso.
+
+    Args:
+        ruta_imagen (str): Ruta de la imagen.
+        tamano_celda (int): Lado de la celda cuadrada en píxeles.
+
+    Returns:
+        dict: 'ruta', 'celda' (numpy.ndarray BGR) y 'puntuacion_simetria',
+            o 'ruta' y 'error' si la imagen no se pudo procesar.
+    """
+    try:
+        procesador = obtener_procesador()
+        imagen = procesador.cargar_para_puntuar(ruta_imagen)
+        resultado = procesador.puntuar_segun_perfil(imagen)
+        # En modo rápido se puntúa sobre una decodificación reducida en escala
+        # de grises; la celda se compone con la imagen en color
+        if imagen.ndim != 3:
+            imagen = procesador.cargar_imagen(ruta_imagen)
+    except Exception as e:
+        return {'ruta': ruta_imagen, 'error': str(e)}
+
+    celda = np.full((tamano_celda, tamano_celda, 3), 255, np.uint8)
+    alto_util = tamano_celda - ALTO_BANDA
+
+    # Recortar la cara (o usar la imagen completa) y escalarla una sola vez al tamaño de la celda
+    if resultado['caja'] is not None:
+        x_inicio, y_inicio, x_fin, y_fin = procesador.limites_region(imagen, resultado['caja'])
+        escala = min(tamano_celda / (x_fin - x_inicio), alto_util / (y_fin - y_inicio))
+        # Enderezada igual que al puntuarla, si el perfil normaliza la pose
+        cara = procesador.recortar_cara(imagen, resultado['caja'], factor_escala=escala,
+                                        angulo=resultado.get('angulo_pose', 0.0))
+    else:
+        escala = min(tamano_celda / imagen.shape[1], alto_util / imagen.shape[0])
+        cara = cv2.resize(imagen, (max(1, int(imagen.shape[1] * escala)), max(1, int(imagen.shape[0] * escala))),
+                          interpolation=cv2.INTER_AREA)
+
+    alto, ancho = cara.shape[:2]
+    x0 = (tamano_celda - ancho) // 2
+    y0 = (alto_util - alto) // 2
+    celda[y0:y0 + alto, x0:x0 + ancho] = cara
+
+    # Línea de simetría en el centro de la cara
+    cv2.line(celda, (x0 + ancho // 2, y0), (x0 + ancho // 2, y0 + alto), (0, 255, 0), 1)
+
+    # Banda con el nombre del archivo y la puntuación, coloreada según el nivel de simetría
+    puntuacion = resultado['puntuacion_simetria']
+    color, _ = clasificar_puntuacion(puntuacion)
+    celda[alto_util:] = color_bgr(color)
+    # Texto oscuro sobre amarillo para mantener el contraste
+    color_texto = (41, 37, 33) if color == '#ffc107' else (255, 255, 255)
+    nombre = os.path.basename(ruta_imagen)
+    nombre = nombre if len(nombre) < 22 else nombre[:19] + "..."
+    cv2.putText(celda, nombre, (4, alto_util + 14), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color_texto, 1, cv2.LINE_AA)
+    cv2.putText(celda, f"Simetria: {puntuacion:.1f}%", (4, alto_util + 30), cv2.FONT_HERSHEY_SIMPLEX,
+                0.45, color_texto, 1, cv2.LINE_AA)
+
+    return {'ruta': ruta_imagen, 'celda': celda, 'puntuacion_simetria': puntuacion}
+
+
+def _mapa_acotado(pool, funcion, elementos, ventana, *args):
+    """
+    Equivalente a pool.map que conserva el orden pero mantiene como máximo
+    'ventana' tareas en vuelo, para que la memoria no crezca con el número de imágenes.
+    """
+    en_vuelo = deque()
+    for elemento in elementos:
+        en_vuelo.append(pool.submit(funcion, elemento, *args))
+        if len(en_vuelo) >= ventana:
+            yield en_vuelo.popleft().result()
+    while en_vuelo:
+        yield en_vuelo.popleft().result()
+
+
+def exportar_informe(rutas, dir_salida, columnas=5, filas=6, tamano_celda=256, calidad=85, num_procesos=None,
+                     perfil=PERFIL_DEFECTO, ruta_perfiles=RUTA_PERFILES_DEFECTO):
+    """
+    Genera hojas de contactos paginadas y un informe HTML para una lista de imágenes.
+    Las páginas se componen directamente con NumPy/OpenCV en un único búfer que
+    se reutiliza, y se escriben en disco en cuanto se llenan.
+
+    Args:
+        rutas (list): Rutas de las imágenes.
+        dir_salida (str): Carpeta donde se escriben las páginas y el informe.
+        columnas (int): Celdas por fila.
+        filas (int): Filas por página.
+        tamano_celda (int): Lado de cada celda en píxeles.
+        calidad (int): Calidad JPEG de las páginas.
+        num_procesos (int): Procesos de trabajo (por defecto, uno por núcleo).
+        perfil (str): Perfil del pipeline con el que se puntúa.
+        ruta_perfiles (str): Archivo JSON de perfiles.
+
+    Returns:
+        dict: Número de páginas, imágenes exportadas y errores, y ruta del informe HTML.
+    """
+    os.makedirs(dir_salida, exist_ok=True)
+    por_pagina = columnas * filas
+    pagina = np.full((filas * tamano_celda, columnas * tamano_celda, 3), 255, np.uint8)
+    num_pagina, en_pagina, exportadas, errores = 0, 0, 0, 0
+    filas_tabla = []
+
+    ruta_html = os.path.join(dir_salida, "informe.html")
+    with open(ruta_html, 'w', encoding='utf-8') as informe:
+        informe.write("<!DOCTYPE html>\n<html lang=\"es\">\n<head><meta charset=\"utf-8\">"
+                      "<title>Informe de Simetría en Gatos</title></head>\n<body>\n"
+                      "<h1>Informe de Simetría en Gatos</h1>\n")
+
+        def escribir_pagina():
+            nonlocal num_pagina, en_pagina, filas_tabla
+            num_pagina += 1
+            nombre_pagina = f"pagina_{num_pagina:04d}.jpg"
+            cv2.imwrite(os.path.join(dir_salida, nombre_pagina), pagina, [cv2.IMWRITE_JPEG_QUALITY, calidad])
+            informe.write(f"<h2>Página {num_pagina}</h2>\n<img src=\"{nombre_pagina}\" style=\"max-width:100%\">\n"
+                          "<table><tr><th>Imagen</th><th>Puntuación</th></tr>\n")
+            informe.write(''.join(filas_tabla))
+            informe.write("</table>\n")
+            informe.flush()
+            pagina[:] = 255
+            en_pagina = 0
+            filas_tabla = []
+
+        with crear_pool(num_procesos, perfil=perfil, perfiles=cargar_perfiles(ruta_perfiles)) as pool:
+            ventana = 4 * (num_procesos or os.cpu_count() or 1)
+            for resultado in _mapa_acotado(pool, preparar_celda, rutas, ventana, tamano_celda):
+                if 'error' in resultado:
+                    errores += 1
+                    print(f"Error al exportar {resultado['ruta']}: {resultado['error']}")
+                    continue
+
+                fila, columna = divmod(en_pagina, columnas)
+                pagina[fila * tamano_celda:(fila + 1) * tamano_celda,
+                       columna * tamano_celda:(columna + 1) * tamano_celda] = resultado['celda']
+                color, mensaje = clasificar_puntuacion(resultado['puntuacion_simetria'])
+                filas_tabla.append(f"<tr><td>{html.escape(resultado['ruta'])}</td>"
+                                   f"<td style=\"color:{color}\">{resultado['puntuacion_simetria']:.1f}% "
+                                   f"({mensaje})</td></tr>\n")
+                en_pagina += 1
+                exportadas += 1
+                if en_pagina == por_pagina:
+                    escribir_pagina()
+
+        if en_pagina:
+            escribir_pagina()
+
+        informe.write(f"<p>{exportadas} imágenes exportadas en {num_pagina} páginas, {errores} errores.</p>\n"
+                      "</body>\n</html>\n")
+
+    return {'paginas': num_pagina, 'imagenes': exportadas, 'errores': errores, 'informe': ruta_html}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta hojas de contactos e informe HTML de una carpeta")
+    parser.add_argument('carpeta')
+    parser.add_argument('salida')
+    parser.add_argument('--columnas', type=int, default=5)
+    parser.add_argument('--filas', type=int, default=6)
+    parser.add_argument('--tamano-celda', type=int, default=256)
+    parser.add_argument('--calidad', type=int, default=85)
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--perfil', default=PERFIL_DEFECTO, help="Perfil del pipeline")
+    parser.add_argument('--perfiles', default=RUTA_PERFILES_DEFECTO, help="Archivo JSON de perfiles")
+    args = parser.parse_args()
+
+    rutas = sorted(os.path.join(args.carpeta, f) for f in os.listdir(args.carpeta)
+                   if f.lower().endswith(EXTENSIONES_IMAGEN))
+    resumen = exportar_informe(rutas, args.salida, args.columnas, args.filas, args.tamano_celda,
+                               args.calidad, args.procesos, args.perfil, args.perfiles)
+    print(f"{resumen['imagenes']} imágenes en {resumen['paginas']} páginas ({resumen['errores']} errores): "
+          f"{resumen['informe']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os
+import time
+import base64
+import sqlite3
+import threading
+from configuracion import VERSION_PIPELINE
+
+# Base de datos por defecto, junto al código de la aplicación
+RUTA_BD_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados.db")
+
+# Métrica de la puntuación calculada por analizar_simetria sobre la cara agrandada
+METRICA_DEFECTO = 'completa'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS imagenes (
+    id INTEGER PRIMARY KEY,
+    ruta TEXT NOT NULL,
+    version_pipeline TEXT NOT NULL,
+    metrica TEXT NOT NULL,
+    puntuacion REAL NOT NULL,
+    caja_x INTEGER,
+    caja_y INTEGER,
+    caja_w INTEGER,
+    caja_h INTEGER,
+    num_caras INTEGER NOT NULL DEFAULT 0,
+    mapa_asimetria BLOB,
+    tamano_archivo INTEGER,
+    fecha_modificacion INTEGER,
+    fecha_registro REAL NOT NULL,
+    UNIQUE (ruta, version_pipeline, metrica)
+);
+CREATE INDEX IF NOT EXISTS idx_imagenes_puntuacion
+    ON imagenes (version_pipeline, metrica, puntuacion);
+CREATE TABLE IF NOT EXISTS caras (
+    imagen_id INTEGER NOT NULL REFERENCES imagenes (id) ON DELETE CASCADE,
+    indice INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    w INTEGER NOT NULL,
+    h INTEGER NOT NULL,
+    puntuacion REAL NOT NULL,
+    PRIMARY KEY (imagen_id, indice)
+);
+CREATE INDEX IF NOT EXISTS idx_caras_puntuacion ON caras (puntuacion);
+"""
+
+
+def firma_archivo(ruta):
+    """
+    Obtiene la firma (tamaño, fecha de modificación) de un archivo, que permite
+    saber si un resultado guardado sigue correspondiendo al archivo actual.
+
+    Args:
+        ruta (str): Ruta del archivo.
+
+    Returns:
+        tuple: (tamano_bytes, fecha_modificacion_ns) o (None, None) si no existe.
+    """
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return None, None
+    return info.st_size, info.st_mtime_ns
+
+
+class IndiceResultados:
+    """
+    Almacén persistente (SQLite) de puntuaciones de simetría por imagen y por cara.
+    Permite ordenar y filtrar por puntuación sin volver a procesar las imágenes.
+    """
+
+    def __init__(self, ruta_bd=RUTA_BD_DEFECTO):
+        self.ruta_bd = ruta_bd
+        # La conexión se comparte entre hilos protegida por un cerrojo
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_bd, check_same_thread=False)
+        self._conexion.execute("PRAGMA foreign_keys = ON")
+        self._conexion.execute("PRAGMA journal_mode = WAL")
+        self._conexion.executescript(_ESQUEMA)
+        # Las bases de datos anteriores al mapa de asimetría no tienen esa columna
+        columnas = [fila[1] for fila in self._conexion.execute("PRAGMA table_info(imagenes)")]
+        if 'mapa_asimetria' not in columnas:
+            self._conexion.execute("ALTER TABLE imagenes ADD COLUMN mapa_asimetria BLOB")
+
+    def cerrar(self):
+        """
+        Cierra la conexión con la base de datos.
+        """
+        with self._lock:
+            self._conexion.close()
+
+    def _insertar(self, ruta, resultado, metrica, version):
+        ruta = os.path.abspath(ruta)
+        tamano, fecha = firma_archivo(ruta)
+        caja = resultado.get('caja') or (None, None, None, None)
+        caras = resultado.get('caras', [])
+        # El mapa de asimetría se guarda como bytes sin codificar (uint8)
+        mapa = resultado.get('mapa_asimetria')
+        mapa = base64.b64decode(mapa) if mapa is not None else None
+
+        self._conexion.execute(
+            "INSERT INTO imagenes (ruta, version_pipeline, metrica, puntuacion, caja_x, caja_y, caja_w, caja_h, "
+            "num_caras, mapa_asimetria, tamano_archivo, fecha_modificacion, fecha_registro) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (ruta, version_pipeline, metrica) DO UPDATE SET "
+            "puntuacion = excluded.puntuacion, caja_x = excluded.caja_x, caja_y = excluded.caja_y, "
+            "caja_w = excluded.caja_w, caja_h = excluded.caja_h, num_caras = excluded.num_caras, "
+            "mapa_asimetria = excluded.mapa_asimetria, tamano_archivo = excluded.tamano_archivo, fecha_modificacion = excluded.fecha_modificacion, "
+            "fecha_registro = excluded.fecha_registro",
+            (ruta, version, metrica, float(resultado['puntuacion_simetria']), *caja,
+             len(caras), mapa, tamano, fecha, time.time()))
+        imagen_id = self._conexion.execute(
+            "SELECT id FROM imagenes WHERE ruta = ? AND version_pipeline = ? AND metrica = ?",
+            (ruta, version, metrica)).fetchone()[0]
+
+        self._conexion.execute("DELETE FROM caras WHERE imagen_id = ?", (imagen_id,))
+        self._conexion.executemany(
+            "INSERT INTO caras (imagen_id, indice, x, y, w, h, puntuacion) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(imagen_id, i, *cara['caja'], float(cara['puntuacion_simetria'])) for i, cara in enumerate(caras)])
+
+    def registrar(self, ruta, resultado, metrica=METRICA_DEFECTO, version=VERSION_PIPELINE):
+        """
+        Guarda (o reemplaza) el resultado de una imagen.
+
+        Args:
+            ruta (str): Ruta de la imagen.
+            resultado (dict): Resultado con 'puntuacion_simetria', 'caja', 'caras' y,
+                opcionalmente, 'mapa_asimetria', como el que devuelve
+                ProcesadorImagenes.puntuar_imagen.
+            metrica (str): Variante de la métrica de simetría utilizada.
+            version (str): Versión del pipeline que produjo el resultado.
+        """
+        self.registrar_lote([(ruta, resultado)], metrica, version)
+
+    def registrar_lote(self, elementos, metrica=METRICA_DEFECTO, version=VERSION_PIPELINE):
+        """
+        Guarda varios resultados en una única transacción.
+
+        Args:
+            elementos (list): Lista de tuplas (ruta, resultado).
+            metrica (str): Variante de la métrica de simetría utilizada.
+            version (str): Versión del pipeline que produjo los resultados.
+        """
+        with self._lock, self._conexion:
+            for ruta, resultado in elementos:
+                self._insertar(ruta, resultado, metrica, version)
+
+    def obtener(self, ruta, metrica=METRICA_DEFECTO, version=VERSION_PIPELINE, comprobar_firma=True):
+        """
+        Recupera el resultado guardado de una imagen.
+
+        Args:
+            ruta (str): Ruta de la imagen.
+            metrica (str): Variante de la métrica de simetría.
+            version (str): Versión del pipeline.
+            comprobar_firma (bool): Si es True, descarta el resultado cuando el
+                archivo ha cambiado desde que se registró.
+
+        Returns:
+            dict: Resultado con 'puntuacion_simetria', 'caja', 'caras' y
+                'mapa_asimetria' (codificado en base64, o None), o None.
+        """
+        ruta = os.path.abspath(ruta)
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT id, puntuacion, caja_x, caja_y, caja_w, caja_h, tamano_archivo, fecha_modificacion, "
+                "mapa_asimetria FROM imagenes WHERE ruta = ? AND version_pipeline = ? AND metrica = ?",
+                (ruta, version, metrica)).fetchone()
+            if fila is None:
+                return None
+            caras = self._conexion.execute(
+                "SELECT x, y, w, h, puntuacion FROM caras WHERE imagen_id = ? ORDER BY indice",
+                (fila[0],)).fetchall()
+
+        if comprobar_firma and firma_archivo(ruta) != (fila[6], fila[7]):
+            return None
+
+        return {
+            'puntuacion_simetria': fila[1],
+            'caja': list(fila[2:6]) if fila[2] is not None else None,
+            'mapa_asimetria': base64.b64encode(fila[8]).decode('ascii') if fila[8] is not None else None,
+            'caras': [{'caja': list(c[:4]), 'puntuacion_simetria': c[4]} for c in caras]
+        }
+
+    def consultar(self, minimo=None, maximo=None, orden='desc', limite=None, carpeta=None,
+                  metrica=METRICA_DEFECTO, version=VERSION_PIPELINE):
+        """
+        Consulta las imágenes por rango de puntuación usando el índice de la tabla.
+
+        Args:
+            minimo (float): Puntuación mínima (incluida).
+            maximo (float): Puntuación máxima (incluida).
+            orden (str): 'desc' (más simétricas primero) o 'asc'.
+            limite (int): Número máximo de resultados.
+            carpeta (str): Si se indica, solo imágenes dentro de esa carpeta.
+            metrica (str): Variante de la métrica de simetría.
+            version (str): Versión del pipeline.
+
+        Returns:
+            list: Lista de tuplas (ruta, puntuacion).
+        """
+        condiciones = ["version_pipeline = ?", "metrica = ?"]
+        parametros = [version, metrica]
+        if minimo is not None:
+            condiciones.append("puntuacion >= ?")
+            parametros.append(minimo)
+        if maximo is not None:
+            condiciones.append("puntuacion <= ?")
+            parametros.append(maximo)
+        if carpeta is not None:
+            # Rango de texto equivalente a "empieza por carpeta/" que aprovecha el índice único
+            prefijo = os.path.join(os.path.abspath(carpeta), '')
+            condiciones.append("ruta >= ? AND ruta < ?")
+            parametros.extend([prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)])
+
+        consulta = (f"SELECT ruta, puntuacion FROM imagenes WHERE {' AND '.join(condiciones)} "
+                    f"ORDER BY puntuacion {'ASC' if orden == 'asc' else 'DESC'}")
+        if limite is not None:
+            consulta += " LIMIT ?"
+            parametros.append(int(limite))
+
+        with self._lock:
+            return self._conexion.execute(consulta, parametros).fetchall()
+
+    def puntuaciones(self, carpeta, metrica=METRICA_DEFECTO, version=VERSION_PIPELINE, comprobar_firma=False):
+        """
+        Devuelve las puntuaciones guardadas de todas las imágenes de una carpeta.
+
+        Args:
+            carpeta (str): Carpeta de imágenes.
+            metrica (str): Variante de la métrica de simetría.
+            version (str): Versión del pipeline.
+            comprobar_firma (bool): Si es True, omite las imágenes que han
+                cambiado (o desaparecido) desde que se registraron.
+
+        Returns:
+            dict: Diccionario {ruta_absoluta: puntuacion}.
+        """
+        if not comprobar_firma:
+            return dict(self.consultar(carpeta=carpeta, metrica=metrica, version=version))
+
+        prefijo = os.path.join(os.path.abspath(carpeta), '')
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT ruta, puntuacion, tamano_archivo, fecha_modificacion FROM imagenes "
+                "WHERE version_pipeline = ? AND metrica = ? AND ruta >= ? AND ruta < ?",
+                (version, metrica, prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1))).fetchall()
+        return {ruta: puntuacion for ruta, puntuacion, tamano, fecha in filas
+                if firma_archivo(ruta) == (tamano, fecha)}
@@ -0,0 +1,327 @@
+import os
+import sys
+import json
+import asyncio
+import tarfile
+import zipfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from configuracion import EXTENSIONES_IMAGEN
+from procesamiento_imagenes import ProcesadorImagenes
+from perfiles import PERFIL_DEFECTO, RUTA_PERFILES_DEFECTO, cargar_perfiles, obtener_perfil
+
+# Marca de fin de etapa que circula por las colas
+_FIN = object()
+
+
+def es_imagen(nombre):
+    """
+    Indica si un nombre de archivo tiene una extensión de imagen soportada.
+    """
+    return nombre.lower().endswith(EXTENSIONES_IMAGEN)
+
+
+def es_archivo_comprimido(ruta):
+    """
+    Indica si la ruta corresponde a un archivo zip o tar que se puede leer sin extraer.
+    """
+    return os.path.isfile(ruta) and (zipfile.is_zipfile(ruta) or tarfile.is_tarfile(ruta))
+
+
+def listar_miembros(ruta_archivo):
+    """
+    Lista los miembros de imagen de un archivo zip o tar.
+
+    Args:
+        ruta_archivo (str): Ruta del archivo comprimido.
+
+    Returns:
+        list: Nombres de los miembros que son imágenes.
+    """
+    if zipfile.is_zipfile(ruta_archivo):
+        with zipfile.ZipFile(ruta_archivo) as archivo:
+            return [m.filename for m in archivo.infolist() if not m.is_dir() and es_imagen(m.filename)]
+    with tarfile.open(ruta_archivo) as archivo:
+        return [m.name for m in archivo.getmembers() if m.isfile() and es_imagen(m.name)]
+
+
+class PipelineIngesta:
+    """
+    Pipeline de ingesta concurrente basado en asyncio.
+
+    Las etapas (lectura de bytes, decodificación y procesamiento) se comunican
+    mediante colas acotadas, de modo que una etapa lenta frena a las anteriores
+    en lugar de acumular imágenes en memoria. La lectura de archivos se hace en
+    un pool de hilos de E/S y la decodificación (cv2.imdecode) y el
+    procesamiento en un pool de hilos de CPU, ya que OpenCV libera el GIL.
+    Los archivos zip y tar se leen directamente, sin extraerlos a disco.
+    """
+
+    def __init__(self, procesar=None, lectores=8, decodificadores=None, trabajadores=None, tamano_cola=32,
+                 perfil=PERFIL_DEFECTO, perfiles=None):
+        """
+        Args:
+            procesar (callable): Función que recibe una imagen BGR y devuelve el
+                resultado. Por defecto, ProcesadorImagenes.puntuar_segun_perfil,
+                que decodifica cada imagen como la necesita el perfil.
+            lectores (int): Lecturas de archivo simultáneas.
+            decodificadores (int): Decodificaciones simultáneas (por defecto, núcleos).
+            trabajadores (int): Procesamientos simultáneos (por defecto, núcleos).
+            tamano_cola (int): Capacidad de cada cola entre etapas.
+            perfil (str): Perfil del pipeline con el que se puntúa.
+            perfiles (dict): Perfiles disponibles (por defecto, los de perfiles.json).
+        """
+        num_nucleos = os.cpu_count() or 1
+        self.procesar = procesar
+        self.lectores = lectores
+        self.decodificadores = decodificadores or num_nucleos
+        self.trabajadores = trabajadores or num_nucleos
+        self.tamano_cola = tamano_cola
+        self.perfil = obtener_perfil(perfil, perfiles if perfiles is not None else cargar_perfiles())
+        # Cada hilo usa su propio procesador: el clasificador no es seguro entre hilos
+        self._local = threading.local()
+
+    def _procesador(self):
+        if not hasattr(self._local, 'procesador'):
+            self._local.procesador = ProcesadorImagenes(perfil=self.perfil)
+        return self._local.procesador
+
+    def _decodificar(self, datos):
+        if self.procesar is not None:
+            return self._procesador().decodificar_imagen(datos)
+        return self._procesador().decodificar_para_puntuar(datos)
+
+    def _procesar(self, imagen):
+        if self.procesar is not None:
+            return self.procesar(imagen)
+        return self._procesador().puntuar_segun_perfil(imagen)
+
+    @staticmethod
+    def _leer_archivo(ruta):
+        with open(ruta, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _leer_comprimido(ruta_archivo, miembros, entregar):
+        # Los miembros de un mismo archivo se leen en secuencia (tarfile no es seguro
+        # entre hilos). Un miembro dañado (p. ej. zlib.error) se entrega como error
+        # sin interrumpir la lectura del resto
+        if zipfile.is_zipfile(ruta_archivo):
+            with zipfile.ZipFile(ruta_archivo) as archivo:
+                leer = archivo.read
+                PipelineIngesta._entregar_miembros(miembros, leer, entregar)
+        else:
+            with tarfile.open(ruta_archivo) as archivo:
+                leer = lambda miembro: archivo.extractfile(miembro).read()
+                PipelineIngesta._entregar_miembros(miembros, leer, entregar)
+
+    @staticmethod
+    def _entregar_miembros(miembros, leer, entregar):
+        for miembro in miembros:
+            try:
+                datos = leer(miembro)
+            except Exception as e:
+                entregar(miembro, None, str(e) or type(e).__name__)
+            else:
+                entregar(miembro, datos, None)
+
+    async def ejecutar(self, fuentes):
+        """
+        Ejecuta el pipeline sobre las fuentes indicadas.
+
+        Args:
+            fuentes (list): Rutas de imágenes, carpetas o archivos zip/tar.
+
+        Yields:
+            dict: {'nombre': ..., 'resultado': ...} o {'nombre': ..., 'error': ...},
+                en el orden en que terminan de procesarse. Los miembros de un
+                archivo comprimido se nombran 'archivo.zip::miembro'.
+        """
+        bucle = asyncio.get_running_loop()
+        cola_rutas = asyncio.Queue(self.tamano_cola)
+        cola_bytes = asyncio.Queue(self.tamano_cola)
+        cola_imagenes = asyncio.Queue(self.tamano_cola)
+        cola_resultados = asyncio.Queue(self.tamano_cola)
+
+        pool_es = ThreadPoolExecutor(max_workers=self.lectores, thread_name_prefix='ingesta-es')
+        pool_cpu = ThreadPoolExecutor(max_workers=self.decodificadores + self.trabajadores,
+                                      thread_name_prefix='ingesta-cpu')
+
+        carpetas_y_archivos = [f for f in fuentes if not es_archivo_comprimido(f)]
+        comprimidos = [f for f in fuentes if es_archivo_comprimido(f)]
+
+        # Cada etapa atrapa los errores de cada elemento y los convierte en un
+        # registro de error, y envía sus marcas de fin aunque falle, para que las
+        # etapas siguientes no esperen indefinidamente
+        async def enumerar_rutas():
+            try:
+                for fuente in carpetas_y_archivos:
+                    if os.path.isdir(fuente):
+                        try:
+                            rutas = await bucle.run_in_executor(pool_es, self._listar_carpeta, fuente)
+                        except Exception as e:
+                            await cola_bytes.put((fuente, None, str(e)))
+                            continue
+                        for ruta in rutas:
+                            await cola_rutas.put(ruta)
+                    else:
+                        await cola_rutas.put(fuente)
+            finally:
+                for _ in range(self.lectores):
+                    await cola_rutas.put(_FIN)
+
+        async def leer_rutas():
+            while True:
+                ruta = await cola_rutas.get()
+                if ruta is _FIN:
+                    return
+                try:
+                    datos = await bucle.run_in_executor(pool_es, self._leer_archivo, ruta)
+                except Exception as e:
+                    await cola_bytes.put((ruta, None, str(e)))
+                else:
+                    await cola_bytes.put((ruta, datos, None))
+
+        async def leer_comprimido(ruta_archivo):
+            try:
+                miembros = await bucle.run_in_executor(pool_es, listar_miembros, ruta_archivo)
+            except Exception as e:
+                await cola_bytes.put((ruta_archivo, None, str(e)))
+                return
+
+            # El hilo lector entrega cada miembro a la cola respetando su capacidad
+            def entregar(miembro, datos, error):
+                asyncio.run_coroutine_threadsafe(
+                    cola_bytes.put((f"{ruta_archivo}::{miembro}", datos, error)), bucle).result()
+
+            try:
+                await bucle.run_in_executor(pool_es, self._leer_comprimido, ruta_archivo, miembros, entregar)
+            except Exception as e:
+                await cola_bytes.put((ruta_archivo, None, str(e)))
+
+        async def etapa_lectura():
+            try:
+                await asyncio.gather(enumerar_rutas(),
+                                     *[leer_rutas() for _ in range(self.lectores)],
+                                     *[leer_comprimido(f) for f in comprimidos])
+            finally:
+                for _ in range(self.decodificadores):
+                    await cola_bytes.put(_FIN)
+
+        async def decodificar():
+            while True:
+                elemento = await cola_bytes.get()
+                if elemento is _FIN:
+                    return
+                nombre, datos, error = elemento
+                if error is None:
+                    try:
+                        imagen = await bucle.run_in_executor(pool_cpu, self._decodificar, datos)
+                    except Exception as e:
+                        # cv2.imdecode lanza cv2.error con datos vacíos
+                        imagen, error = None, str(e) or type(e).__name__
+                await cola_imagenes.put((nombre, None if error else imagen, error))
+
+        async def etapa_decodificacion():
+            try:
+                await asyncio.gather(*[decodificar() for _ in range(self.decodificadores)])
+            finally:
+                for _ in range(self.trabajadores):
+                    await cola_imagenes.put(_FIN)
+
+        async def procesar():
+            while True:
+                elemento = await cola_imagenes.get()
+                if elemento is _FIN:
+                    return
+                nombre, imagen, error = elemento
+                if error is not None:
+                    await cola_resultados.put({'nombre': nombre, 'error': error})
+                    continue
+                try:
+                    resultado = await bucle.run_in_executor(pool_cpu, self._procesar, imagen)
+                except Exception as e:
+                    await cola_resultados.put({'nombre': nombre, 'error': str(e) or type(e).__name__})
+                else:
+                    await cola_resultados.put({'nombre': nombre, 'resultado': resultado})
+
+        async def etapa_procesamiento():
+            try:
+                await asyncio.gather(*[procesar() for _ in range(self.trabajadores)])
+            finally:
+                await cola_resultados.put(_FIN)
+
+        tareas = [asyncio.ensure_future(etapa_lectura()),
+                  asyncio.ensure_future(etapa_decodificacion()),
+                  asyncio.ensure_future(etapa_procesamiento())]
+        try:
+            while True:
+                # Esperar el siguiente resultado, pero propagar el fallo de una
+                # etapa en lugar de quedarse bloqueado en la cola
+                siguiente = asyncio.ensure_future(cola_resultados.get())
+                await asyncio.wait([siguiente] + [t for t in tareas if not t.done()],
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not siguiente.done():
+                    siguiente.cancel()
+                    for tarea in tareas:
+                        if tarea.done() and tarea.exception() is not None:
+                            raise tarea.exception()
+                    continue
+                salida = siguiente.result()
+                if salida is _FIN:
+                    break
+                yield salida
+            await asyncio.gather(*tareas)
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            pool_es.shutdown(wait=False, cancel_futures=True)
+            pool_cpu.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _listar_carpeta(carpeta):
+        rutas = []
+        for raiz, _, archivos in os.walk(carpeta):
+            rutas.extend(os.path.join(raiz, f) for f in sorted(archivos) if es_imagen(f))
+        return rutas
+
+
+def ingerir(fuentes, **opciones):
+    """
+    Ejecuta el pipeline de ingesta de forma síncrona y devuelve todos los resultados.
+
+    Args:
+        fuentes (list): Rutas de imágenes, carpetas o archivos zip/tar.
+        **opciones: Parámetros de PipelineIngesta.
+
+    Returns:
+        list: Resultados en el orden en que terminaron de procesarse.
+    """
+    async def recolectar():
+        return [salida async for salida in PipelineIngesta(**opciones).ejecutar(fuentes)]
+    return asyncio.run(recolectar())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta concurrente y puntuación de imágenes de gatos")
+    parser.add_argument('fuentes', nargs='+', help="Imágenes, carpetas o archivos zip/tar")
+    parser.add_argument('--lectores', type=int, default=8)
+    parser.add_argument('--trabajadores', type=int, default=None)
+    parser.add_argument('--tamano-cola', type=int, default=32)
+    parser.add_argument('--perfil', default=PERFIL_DEFECTO, help="Perfil del pipeline")
+    parser.add_argument('--perfiles', default=RUTA_PERFILES_DEFECTO, help="Archivo JSON de perfiles")
+    args = parser.parse_args()
+
+    async def ejecutar():
+        pipeline = PipelineIngesta(lectores=args.lectores, trabajadores=args.trabajadores,
+                                   tamano_cola=args.tamano_cola, perfil=args.perfil,
+                                   perfiles=cargar_perfiles(args.perfiles))
+        async for salida in pipeline.ejecutar(args.fuentes):
+            sys.stdout.write(json.dumps(salida) + '\n')
+
+    asyncio.run(ejecutar())
+
+
+if __name__ == "__main__":
+    main()
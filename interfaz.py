@@ -1,12 +1,31 @@
 import os
+import threading
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
-import cv2
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from procesamiento_imagenes import ProcesadorImagenes
+from configuracion import EXTENSIONES_IMAGEN, MEMORIA_RESULTADOS, MEMORIA_MINIATURAS, clasificar_puntuacion
+from indice_resultados import IndiceResultados, RUTA_BD_DEFECTO
+from cache_memoria import CacheMemoria
+from perfiles import PERFIL_DEFECTO, cargar_perfiles, obtener_perfil, metrica_perfil
+
+# OpenCV, Matplotlib y el procesador se importan de forma diferida: la ventana y las
+# primeras miniaturas se muestran antes de que terminen de cargarse.
+
+# Miniaturas que se cargan de una vez en cada paso del bucle de eventos
+MINIATURAS_POR_PASO = 8
+
+# Imágenes por tarea en la puntuación en segundo plano y periodo de sondeo (ms)
+IMAGENES_POR_TAREA = 4
+IMAGENES_POR_TAREA_HASH = 32
+PERIODO_SONDEO_MS = 200
+
+# Tamaño máximo de las miniaturas y retardo (ms) para cargar las visibles tras un desplazamiento
+TAMANO_MINIATURA = 300
+RETARDO_MINIATURAS_VISIBLES_MS = 50
+
+# Resultados de procesar_imagen_completa que la interfaz no muestra (imágenes a
+# tamaño completo); no se guardan en la caché de resultados
+CLAVES_NO_MOSTRADAS = ('original', 'deteccion_cara')
 
 class InterfazSimetriaGatos:
     """
@@ -15,24 +34,55 @@ class InterfazSimetriaGatos:
     Incluye un menú navegable para facilitar el acceso a las diferentes secciones.
     """
     
-    def __init__(self, root):
+    def __init__(self, root, memoria_resultados=MEMORIA_RESULTADOS, memoria_miniaturas=MEMORIA_MINIATURAS,
+                 ruta_indice=RUTA_BD_DEFECTO):
+        """
+        Args:
+            root (tk.Tk): Ventana principal.
+            memoria_resultados (int): Bytes máximos de los resultados procesados en memoria.
+            memoria_miniaturas (int): Bytes máximos de las imágenes de las miniaturas.
+            ruta_indice (str): Base de datos del índice de resultados.
+        """
         self.root = root
         self.root.title("Análisis de Simetría en Gatos")
         self.root.geometry("1200x800")
         self.root.configure(bg="#f0f0f0")
         # Hacer que la ventana sea maximizada por defecto
-        self.root.state('zoomed')
+        try:
+            self.root.state('zoomed')
+        except tk.TclError:
+            # En X11 no existe el estado 'zoomed'
+            self.root.attributes('-zoomed', True)
+        
+        # Perfiles del pipeline; el perfil elegido también decide qué puntuaciones
+        # guardadas en el índice son válidas
+        self.perfiles = cargar_perfiles()
+        self.seleccionar_perfil(PERFIL_DEFECTO)
         
-        # Inicializar el procesador de imágenes
-        self.procesador = ProcesadorImagenes()
+        # El procesador de imágenes (OpenCV y el clasificador) se carga en segundo plano
+        self.procesador = None
+        self.procesador_listo = threading.Event()
+        threading.Thread(target=self.precargar_procesamiento, daemon=True).start()
         
         # Directorio de imágenes
         self.dir_imagenes = os.path.join(os.path.dirname(os.path.abspath(__file__)), "img")
         
-        # Variables para almacenar imágenes y resultados
+        # Índice persistente de puntuaciones para ordenar y filtrar el repositorio
+        self.indice = IndiceResultados(ruta_indice)
+        
+        # Variables para almacenar imágenes y resultados. Los resultados procesados y
+        # las miniaturas se guardan en cachés LRU acotadas en bytes, para que la
+        # memoria no crezca al recorrer muchas imágenes
         self.imagen_seleccionada = None
         self.resultados_procesamiento = None
-        self.miniaturas = []
+        self.cache_resultados = CacheMemoria(memoria_resultados)
+        self.miniaturas = CacheMemoria(memoria_miniaturas, al_expulsar=self.liberar_miniatura)
+        self.miniatura_vacia = tk.PhotoImage(width=1, height=1)
+        self.botones_miniatura = {}
+        self.miniaturas_visibles_programadas = False
+        self.tarjetas = {}
+        self.etiquetas_puntuacion = {}
+        self.puntuaciones = {}
         
         # Crear la interfaz
         self.crear_interfaz()
@@ -40,7 +90,78 @@ class InterfazSimetriaGatos:
         # Crear encabezado
         self.crear_encabezado()
         
-        # Cargar miniaturas de imágenes
+        # Pool de procesos para puntuar el repositorio en segundo plano (se crea al usarlo)
+        self.pool_puntuacion = None
+        self.tareas_puntuacion = []
+        self.grupos_duplicados = {}
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
+        
+        # Cargar miniaturas de imágenes en cuanto la ventana esté en el bucle de eventos
+        self.generacion_miniaturas = 0
+        self.root.after(0, self.cargar_miniaturas)
+    
+    def cerrar(self):
+        """
+        Detiene la puntuación en segundo plano, cierra el índice y la ventana.
+        """
+        if self.pool_puntuacion is not None:
+            self.pool_puntuacion.shutdown(wait=False, cancel_futures=True)
+        if self.procesador is not None:
+            self.procesador.cerrar()
+        self.indice.cerrar()
+        self.root.destroy()
+    
+    def precargar_procesamiento(self):
+        """
+        Importa los módulos pesados y carga el clasificador de caras en un hilo en
+        segundo plano, mientras la ventana ya responde.
+        """
+        try:
+            from procesamiento_imagenes import ProcesadorImagenes
+            procesador = ProcesadorImagenes(perfil=self.perfil)
+            procesador.precargar()
+            self.procesador = procesador
+        finally:
+            self.procesador_listo.set()
+        
+        # Matplotlib solo se necesita al mostrar el análisis de simetría
+        import matplotlib.pyplot
+        import matplotlib.backends.backend_tkagg
+    
+    def obtener_procesador(self):
+        """
+        Devuelve el procesador de imágenes, esperando a que termine de cargarse si
+        aún no está listo.
+        """
+        self.procesador_listo.wait()
+        if self.procesador is None:
+            raise RuntimeError("No se pudo cargar el procesador de imágenes")
+        if self.procesador.perfil['nombre'] != self.nombre_perfil:
+            from procesamiento_imagenes import ProcesadorImagenes
+            self.procesador.cerrar()
+            self.procesador = ProcesadorImagenes(perfil=self.perfil)
+        return self.procesador
+    
+    def seleccionar_perfil(self, nombre):
+        """
+        Selecciona el perfil del pipeline con el que se procesan y puntúan las imágenes.
+        
+        Args:
+            nombre (str): Nombre del perfil.
+        """
+        self.nombre_perfil = nombre
+        self.perfil = obtener_perfil(nombre, self.perfiles)
+        self.metrica = metrica_perfil(self.perfil)
+    
+    def cambiar_perfil(self):
+        """
+        Aplica el perfil elegido en el selector y recarga el repositorio con sus puntuaciones.
+        """
+        if self.perfil_var.get() == self.nombre_perfil:
+            return
+        self.seleccionar_perfil(self.perfil_var.get())
+        # Los procesos de trabajo se inicializan con un perfil por defecto, pero
+        # cada tarea indica el suyo, así que el pool se puede reutilizar
         self.cargar_miniaturas()
     
     def crear_interfaz(self):
@@ -125,6 +246,7 @@ class InterfazSimetriaGatos:
         # Mostrar la sección seleccionada y ajustarla para ocupar todo el espacio
         if seccion == "repositorio":
             self.frame_repositorio.pack(fill=tk.BOTH, expand=True, padx=0, pady=0)
+            self.programar_miniaturas_visibles()
         elif seccion == "imagen":
             self.frame_imagen_seleccionada.pack(fill=tk.BOTH, expand=True, padx=0, pady=0)
         elif seccion == "proceso":
@@ -171,6 +293,40 @@ class InterfazSimetriaGatos:
         ttk.Label(titulo_frame, text="Repositorio de Imágenes", 
                  font=("Arial", 16, "bold"), background="#ffffff").pack(side=tk.LEFT, padx=10)
         
+        # Controles para ordenar y filtrar por puntuación de simetría
+        filtros_frame = ttk.Frame(titulo_frame, style="Card.TFrame")
+        filtros_frame.pack(side=tk.RIGHT, padx=10)
+        
+        self.orden_var = tk.StringVar(value="Nombre")
+        self.minimo_var = tk.DoubleVar(value=0)
+        self.maximo_var = tk.DoubleVar(value=100)
+        self.perfil_var = tk.StringVar(value=self.nombre_perfil)
+        
+        ttk.Label(filtros_frame, text="Perfil:", background="#ffffff").pack(side=tk.LEFT, padx=(0, 5))
+        perfil_combo = ttk.Combobox(filtros_frame, textvariable=self.perfil_var, state="readonly", width=12,
+                                    values=list(self.perfiles))
+        perfil_combo.pack(side=tk.LEFT, padx=(0, 10))
+        perfil_combo.bind("<<ComboboxSelected>>", lambda e: self.cambiar_perfil())
+        
+        ttk.Label(filtros_frame, text="Ordenar por:", background="#ffffff").pack(side=tk.LEFT, padx=(0, 5))
+        orden_combo = ttk.Combobox(filtros_frame, textvariable=self.orden_var, state="readonly", width=16,
+                                   values=["Nombre", "Mayor simetría", "Menor simetría"])
+        orden_combo.pack(side=tk.LEFT, padx=5)
+        orden_combo.bind("<<ComboboxSelected>>", lambda e: self.aplicar_orden_filtro())
+        
+        ttk.Label(filtros_frame, text="Simetría entre", background="#ffffff").pack(side=tk.LEFT, padx=(10, 5))
+        ttk.Spinbox(filtros_frame, from_=0, to=100, increment=5, width=5,
+                    textvariable=self.minimo_var).pack(side=tk.LEFT)
+        ttk.Label(filtros_frame, text="y", background="#ffffff").pack(side=tk.LEFT, padx=5)
+        ttk.Spinbox(filtros_frame, from_=0, to=100, increment=5, width=5,
+                    textvariable=self.maximo_var).pack(side=tk.LEFT)
+        ttk.Button(filtros_frame, text="Filtrar", style="Boton.TButton",
+                  command=self.aplicar_orden_filtro).pack(side=tk.LEFT, padx=5)
+        
+        # Progreso de la puntuación en segundo plano
+        self.etiqueta_progreso = ttk.Label(titulo_frame, text="", foreground="#555555", background="#ffffff")
+        self.etiqueta_progreso.pack(side=tk.LEFT, padx=10)
+        
         # Canvas para mostrar miniaturas con scrollbar
         self.canvas_frame = ttk.Frame(self.frame_repositorio)
         self.canvas_frame.pack(fill=tk.BOTH, expand=True, padx=0, pady=0)
@@ -190,7 +346,13 @@ class InterfazSimetriaGatos:
         
         # Configurar el canvas para que ocupe todo el espacio
         self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw", width=self.canvas.winfo_width())
-        self.canvas.configure(yscrollcommand=scrollbar.set)
+        
+        # Al desplazarse (o redimensionar), cargar las miniaturas que pasan a ser visibles
+        def al_desplazar(*args):
+            scrollbar.set(*args)
+            self.programar_miniaturas_visibles()
+        
+        self.canvas.configure(yscrollcommand=al_desplazar)
         
         # Hacer que el canvas se expanda con la ventana
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -314,7 +476,10 @@ class InterfazSimetriaGatos:
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
         
-        self.miniaturas = []
+        self.botones_miniatura = {}
+        self.miniaturas.limpiar()
+        self.tarjetas = {}
+        self.etiquetas_puntuacion = {}
         
         # Verificar si el directorio existe
         if not os.path.exists(self.dir_imagenes):
@@ -323,61 +488,25 @@ class InterfazSimetriaGatos:
         
         # Obtener lista de archivos de imagen
         archivos_imagen = [f for f in os.listdir(self.dir_imagenes) 
-                          if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif'))]
+                          if f.lower().endswith(EXTENSIONES_IMAGEN)]
         
         if not archivos_imagen:
             ttk.Label(self.scrollable_frame, text="No se encontraron imágenes", foreground="red").pack(pady=10)
             return
         
         # Título informativo
-        ttk.Label(self.scrollable_frame, text=f"Se encontraron {len(archivos_imagen)} imágenes", 
-                 font=("Arial", 10), background="#f0f0f0").pack(pady=(0, 10))
+        self.etiqueta_conteo = ttk.Label(self.scrollable_frame, text=f"Se encontraron {len(archivos_imagen)} imágenes", 
+                                         font=("Arial", 10), background="#f0f0f0")
+        self.etiqueta_conteo.pack(pady=(0, 10))
         
         # Crear un contenedor grid para las miniaturas
-        grid_frame = ttk.Frame(self.scrollable_frame)
-        grid_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        grid_frame.grid_columnconfigure(tuple(range(4)), weight=1)  # 4 columnas con peso igual
-        
-        # Cargar y mostrar miniaturas en grid
-        row = 0
-        col = 0
-        for archivo in archivos_imagen:
-            # Frame para cada miniatura
-            thumb_frame = ttk.Frame(grid_frame, style="Card.TFrame")
-            thumb_frame.grid(row=row, column=col, padx=5, pady=5, sticky="nsew")
-            
-            # Configurar el thumb_frame para expandirse
-            thumb_frame.grid_columnconfigure(0, weight=1)
-            thumb_frame.grid_rowconfigure(0, weight=1)
-            
-            # Actualizar índices de grid
-            col += 1
-            if col >= 4:  # 4 miniaturas por fila
-                col = 0
-                row += 1
-            
-            # Cargar imagen y crear miniatura
-            ruta_completa = os.path.join(self.dir_imagenes, archivo)
-            try:
-                # Usar PIL para crear miniatura
-                img = Image.open(ruta_completa)
-                img.thumbnail((300, 300))  # Redimensionar a 300x300 para miniaturas más grandes
-                img_tk = ImageTk.PhotoImage(img)
-                
-                # Guardar referencia para evitar que sea eliminada por el recolector de basura
-                self.miniaturas.append(img_tk)
-                
-                # Crear botón con la miniatura
-                btn = tk.Button(thumb_frame, image=img_tk, bd=0,
-                               command=lambda ruta=ruta_completa: self.seleccionar_imagen(ruta))
-                btn.pack(padx=5, pady=5)
-                
-                # Etiqueta con el nombre del archivo
-                nombre_corto = archivo if len(archivo) < 15 else archivo[:12] + "..."
-                ttk.Label(thumb_frame, text=nombre_corto, background="#ffffff").pack(pady=(0, 5))
-                
-            except Exception as e:
-                print(f"Error al cargar {archivo}: {e}")
+        self.grid_miniaturas = ttk.Frame(self.scrollable_frame)
+        self.grid_miniaturas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.grid_miniaturas.grid_columnconfigure(tuple(range(4)), weight=1)  # 4 columnas con peso igual
+        
+        # Puntuaciones ya calculadas, leídas del índice sin reprocesar ninguna imagen
+        self.puntuaciones = self.indice.puntuaciones(self.dir_imagenes, metrica=self.metrica,
+                                                   comprobar_firma=True)
         
         # Añadir instrucciones al final
         instrucciones_frame = ttk.Frame(self.scrollable_frame)
@@ -385,6 +514,352 @@ class InterfazSimetriaGatos:
         
         ttk.Label(instrucciones_frame, text="Haga clic en una imagen para analizarla", 
                  font=("Arial", 10, "italic"), foreground="#555555").pack(pady=5)
+        
+        # Cargar las miniaturas por pasos: la primera fila visible de inmediato y el
+        # resto en pasos sucesivos del bucle de eventos, sin bloquear la ventana
+        self.generacion_miniaturas += 1
+        pendientes = sorted((os.path.join(self.dir_imagenes, f) for f in archivos_imagen),
+                            key=lambda r: os.path.basename(r).lower())
+        self.cargar_paso_miniaturas(pendientes, self.generacion_miniaturas)
+    
+    def cargar_paso_miniaturas(self, pendientes, generacion):
+        """
+        Carga un paso de miniaturas pendientes y programa el siguiente.
+        
+        Args:
+            pendientes (list): Rutas de imágenes aún sin miniatura, en orden de visualización.
+            generacion (int): Generación de la carga; si se recargan las imágenes,
+                los pasos de la carga anterior se descartan.
+        """
+        if generacion != self.generacion_miniaturas:
+            return
+        
+        for ruta in pendientes[:MINIATURAS_POR_PASO]:
+            self.crear_tarjeta_miniatura(ruta)
+            tarjeta = self.tarjetas.get(ruta)
+            if tarjeta is not None:
+                # Colocar la tarjeta al final del grid de 4 columnas
+                i = len(self.tarjetas) - 1
+                tarjeta.grid(row=i // 4, column=i % 4, padx=5, pady=5, sticky="nsew")
+        
+        self.programar_miniaturas_visibles()
+        
+        restantes = pendientes[MINIATURAS_POR_PASO:]
+        if restantes:
+            self.root.after(1, self.cargar_paso_miniaturas, restantes, generacion)
+        else:
+            # Todas cargadas: aplicar el orden y el filtro elegidos por el usuario
+            self.aplicar_orden_filtro()
+            
+            # Puntuar en segundo plano las imágenes que aún no están en el índice
+            self.iniciar_puntuacion_segundo_plano(generacion)
+    
+    def iniciar_puntuacion_segundo_plano(self, generacion):
+        """
+        Puntúa en un pool de procesos las imágenes del repositorio sin puntuación
+        guardada. Primero se calculan sus hashes perceptuales para agrupar los casi
+        duplicados; después solo se puntúa un representante por grupo, en tareas
+        pequeñas para que las insignias aparezcan progresivamente.
+        
+        Args:
+            generacion (int): Generación de la carga de miniaturas.
+        """
+        # Descartar las tareas de una carga anterior
+        for _, futuro in self.tareas_puntuacion:
+            futuro.cancel()
+        self.tareas_puntuacion = []
+        
+        pendientes = [ruta for ruta in self.tarjetas if ruta not in self.puntuaciones]
+        if not pendientes:
+            self.etiqueta_progreso.configure(text="")
+            return
+        
+        from procesamiento_lotes import crear_pool
+        from deduplicacion import calcular_hashes
+        if self.pool_puntuacion is None:
+            # Dejar un núcleo libre para la interfaz
+            num_procesos = max(1, (os.cpu_count() or 1) - 1)
+            self.pool_puntuacion = crear_pool(num_procesos, metodo_inicio='spawn')
+        
+        tareas_hash = [self.pool_puntuacion.submit(calcular_hashes, pendientes[i:i + IMAGENES_POR_TAREA_HASH], 'dhash', 1)
+                       for i in range(0, len(pendientes), IMAGENES_POR_TAREA_HASH)]
+        
+        self.total_puntuacion = len(pendientes)
+        self.etiqueta_progreso.configure(text="Buscando imágenes duplicadas...")
+        self.root.after(PERIODO_SONDEO_MS, self.sondear_hashes_segundo_plano, pendientes, tareas_hash, generacion)
+    
+    def sondear_hashes_segundo_plano(self, pendientes, tareas_hash, generacion):
+        """
+        Espera a que terminen los hashes, agrupa los casi duplicados y envía a
+        puntuar solo los representantes de cada grupo.
+        
+        Args:
+            pendientes (list): Rutas de las imágenes por puntuar.
+            tareas_hash (list): Futuros con los hashes de cada bloque de rutas.
+            generacion (int): Generación de la carga de miniaturas.
+        """
+        if generacion != self.generacion_miniaturas:
+            for futuro in tareas_hash:
+                futuro.cancel()
+            return
+        if not all(f.done() for f in tareas_hash):
+            self.root.after(PERIODO_SONDEO_MS, self.sondear_hashes_segundo_plano, pendientes, tareas_hash, generacion)
+            return
+        
+        from procesamiento_lotes import puntuar_elementos
+        from deduplicacion import agrupar_duplicados
+        
+        hashes = {}
+        for futuro in tareas_hash:
+            try:
+                hashes.update(futuro.result())
+            except Exception as e:
+                print(f"Error al calcular hashes: {e}")
+        
+        # Agrupar en el orden de exploración; las imágenes sin hash forman su propio grupo
+        self.grupos_duplicados = agrupar_duplicados({r: hashes[r] for r in pendientes if r in hashes})
+        for ruta in pendientes:
+            if ruta not in hashes:
+                self.grupos_duplicados[ruta] = [ruta]
+        
+        representantes = list(self.grupos_duplicados)
+        for i in range(0, len(representantes), IMAGENES_POR_TAREA):
+            rutas = representantes[i:i + IMAGENES_POR_TAREA]
+            futuro = self.pool_puntuacion.submit(puntuar_elementos, [{'ruta': r} for r in rutas],
+                                                 False, self.nombre_perfil)
+            self.tareas_puntuacion.append((rutas, futuro))
+        
+        self.etiqueta_progreso.configure(
+            text=f"Puntuando 0/{self.total_puntuacion} ({len(pendientes) - len(representantes)} duplicados)...")
+        self.root.after(PERIODO_SONDEO_MS, self.sondear_puntuacion_segundo_plano, generacion)
+    
+    def sondear_puntuacion_segundo_plano(self, generacion):
+        """
+        Recoge las tareas de puntuación terminadas, propaga cada resultado a los
+        duplicados de su grupo, lo guarda en el índice y actualiza las insignias
+        sin bloquear el bucle de eventos.
+        
+        Args:
+            generacion (int): Generación de la carga de miniaturas.
+        """
+        if generacion != self.generacion_miniaturas:
+            return
+        
+        terminadas = [(rutas, f) for rutas, f in self.tareas_puntuacion if f.done()]
+        self.tareas_puntuacion = [(rutas, f) for rutas, f in self.tareas_puntuacion if not f.done()]
+        
+        resultados_representantes = {}
+        for rutas, futuro in terminadas:
+            try:
+                resultados = futuro.result()
+            except Exception as e:
+                print(f"Error en la puntuación en segundo plano: {e}")
+                continue
+            for ruta, resultado in zip(rutas, resultados):
+                if 'error' in resultado:
+                    print(f"Error al puntuar {os.path.basename(ruta)}: {resultado['error']}")
+                    continue
+                resultados_representantes[ruta] = resultado
+        
+        # Los casi duplicados heredan el resultado de su representante, con las
+        # cajas escaladas a su propia resolución
+        from deduplicacion import heredar_resultados
+        nuevos = list(heredar_resultados(self.grupos_duplicados, resultados_representantes).items())
+        
+        if nuevos:
+            self.indice.registrar_lote(nuevos, metrica=self.metrica)
+            for ruta, resultado in nuevos:
+                self.puntuaciones[ruta] = resultado['puntuacion_simetria']
+                self.actualizar_puntuacion_miniatura(ruta)
+            
+            # Mantener el orden por puntuación a medida que llegan resultados
+            minimo, maximo = self.leer_rango_filtro()
+            if self.orden_var.get() != "Nombre" or minimo > 0 or maximo < 100:
+                self.aplicar_orden_filtro()
+        
+        restantes = sum(len(self.grupos_duplicados.get(r, [r])) for rutas, _ in self.tareas_puntuacion for r in rutas)
+        if restantes:
+            self.etiqueta_progreso.configure(
+                text=f"Puntuando {self.total_puntuacion - restantes}/{self.total_puntuacion}...")
+            self.root.after(PERIODO_SONDEO_MS, self.sondear_puntuacion_segundo_plano, generacion)
+        else:
+            self.etiqueta_progreso.configure(text="")
+    
+    def crear_tarjeta_miniatura(self, ruta_completa):
+        """
+        Crea la tarjeta (miniatura, nombre y puntuación) de una imagen del repositorio.
+        
+        Args:
+            ruta_completa (str): Ruta de la imagen.
+        """
+        archivo = os.path.basename(ruta_completa)
+        
+        # Frame para cada miniatura
+        thumb_frame = ttk.Frame(self.grid_miniaturas, style="Card.TFrame")
+        
+        # Configurar el thumb_frame para expandirse
+        thumb_frame.grid_columnconfigure(0, weight=1)
+        thumb_frame.grid_rowconfigure(0, weight=1)
+        
+        try:
+            # Tamaño de la miniatura a partir de la cabecera, sin decodificar la imagen
+            with Image.open(ruta_completa) as img:
+                ancho, alto = img.size
+            escala = min(TAMANO_MINIATURA / ancho, TAMANO_MINIATURA / alto, 1)
+            tamano = (max(1, round(ancho * escala)), max(1, round(alto * escala)))
+            
+            # Crear botón con un hueco del tamaño de la miniatura; la imagen se carga
+            # ahora si cabe en la caché, o cuando la tarjeta se vuelva visible
+            btn = tk.Button(thumb_frame, image=self.miniatura_vacia, width=tamano[0], height=tamano[1], bd=0,
+                           command=lambda ruta=ruta_completa: self.seleccionar_imagen(ruta))
+            btn.pack(padx=5, pady=5)
+            self.botones_miniatura[ruta_completa] = btn
+            if self.miniaturas.cabe(tamano[0] * tamano[1] * 4):
+                self.cargar_imagen_miniatura(ruta_completa)
+            
+            # Etiqueta con el nombre del archivo
+            nombre_corto = archivo if len(archivo) < 15 else archivo[:12] + "..."
+            ttk.Label(thumb_frame, text=nombre_corto, background="#ffffff").pack(pady=(0, 5))
+            
+            # Insignia con la puntuación de simetría, si ya se conoce
+            etiqueta = tk.Label(thumb_frame, text="", font=("Arial", 10, "bold"), padx=6)
+            etiqueta.pack(pady=(0, 5))
+            self.etiquetas_puntuacion[ruta_completa] = etiqueta
+            self.actualizar_puntuacion_miniatura(ruta_completa)
+            
+            self.tarjetas[ruta_completa] = thumb_frame
+            
+        except Exception as e:
+            thumb_frame.destroy()
+            print(f"Error al cargar {archivo}: {e}")
+    
+    def cargar_imagen_miniatura(self, ruta):
+        """
+        Decodifica la miniatura de una imagen, la muestra en su botón y la guarda
+        en la caché de miniaturas.
+        
+        Args:
+            ruta (str): Ruta de la imagen.
+        """
+        boton = self.botones_miniatura.get(ruta)
+        if boton is None:
+            return
+        try:
+            # Usar PIL para crear miniatura (en JPEG, decodificando ya a tamaño reducido)
+            img = Image.open(ruta)
+            img.draft('RGB', (TAMANO_MINIATURA, TAMANO_MINIATURA))
+            img.thumbnail((TAMANO_MINIATURA, TAMANO_MINIATURA))
+            img_tk = ImageTk.PhotoImage(img)
+        except Exception as e:
+            print(f"Error al cargar {os.path.basename(ruta)}: {e}")
+            return
+        
+        boton.configure(image=img_tk, width=img_tk.width(), height=img_tk.height())
+        # La caché mantiene la referencia para que el recolector de basura no la elimine
+        self.miniaturas.guardar(ruta, img_tk)
+    
+    def liberar_miniatura(self, ruta, img_tk):
+        """
+        Quita del botón una miniatura expulsada de la caché, conservando su tamaño
+        para que la cuadrícula no se mueva.
+        """
+        boton = self.botones_miniatura.get(ruta)
+        if boton is not None and boton.winfo_exists():
+            boton.configure(image=self.miniatura_vacia)
+    
+    def programar_miniaturas_visibles(self):
+        """
+        Programa la carga de las miniaturas visibles, agrupando los eventos de
+        desplazamiento seguidos en una sola actualización.
+        """
+        if not self.miniaturas_visibles_programadas:
+            self.miniaturas_visibles_programadas = True
+            self.root.after(RETARDO_MINIATURAS_VISIBLES_MS, self.actualizar_miniaturas_visibles)
+    
+    def actualizar_miniaturas_visibles(self):
+        """
+        Carga las miniaturas de las tarjetas visibles (y de una pantalla por encima
+        y por debajo) que no están en la caché, y marca como recientes las que sí.
+        """
+        self.miniaturas_visibles_programadas = False
+        if not self.tarjetas or not self.grid_miniaturas.winfo_ismapped():
+            return
+        
+        alto = self.canvas.winfo_height()
+        arriba = self.canvas.canvasy(0) - alto
+        abajo = self.canvas.canvasy(0) + 2 * alto
+        base = self.grid_miniaturas.winfo_y()
+        for ruta, tarjeta in self.tarjetas.items():
+            if not tarjeta.winfo_ismapped():
+                continue
+            y = base + tarjeta.winfo_y()
+            if y + tarjeta.winfo_height() >= arriba and y <= abajo:
+                if self.miniaturas.obtener(ruta) is None:
+                    self.cargar_imagen_miniatura(ruta)
+    
+    def actualizar_puntuacion_miniatura(self, ruta):
+        """
+        Actualiza la insignia de puntuación de una miniatura con el mismo código de
+        colores que el análisis de simetría (verde, amarillo, rojo).
+        
+        Args:
+            ruta (str): Ruta de la imagen.
+        """
+        etiqueta = self.etiquetas_puntuacion.get(ruta)
+        if etiqueta is None:
+            return
+        puntuacion = self.puntuaciones.get(ruta)
+        if puntuacion is None:
+            etiqueta.configure(text="Sin analizar", background="#ffffff", foreground="#888888")
+            return
+        color, mensaje = clasificar_puntuacion(puntuacion)
+        # Texto oscuro sobre amarillo para mantener el contraste
+        texto_color = "#212529" if color == '#ffc107' else "#ffffff"
+        etiqueta.configure(text=f"{puntuacion:.1f}% · {mensaje}", background=color, foreground=texto_color)
+    
+    def leer_rango_filtro(self):
+        """
+        Lee el rango de puntuación del filtro; si no es válido, usa 0-100.
+        
+        Returns:
+            tuple: (minimo, maximo)
+        """
+        try:
+            return float(self.minimo_var.get()), float(self.maximo_var.get())
+        except (tk.TclError, ValueError):
+            return 0, 100
+    
+    def aplicar_orden_filtro(self):
+        """
+        Reordena y filtra las miniaturas ya cargadas según su puntuación de simetría,
+        sin volver a leer las imágenes ni a procesarlas.
+        """
+        if not self.tarjetas:
+            return
+        
+        minimo, maximo = self.leer_rango_filtro()
+        
+        # Con un rango distinto de 0-100 solo se muestran las imágenes ya puntuadas
+        filtrar = minimo > 0 or maximo < 100
+        rutas = [ruta for ruta in self.tarjetas
+                 if not filtrar or (ruta in self.puntuaciones and minimo <= self.puntuaciones[ruta] <= maximo)]
+        
+        orden = self.orden_var.get()
+        if orden == "Nombre":
+            rutas.sort(key=lambda r: os.path.basename(r).lower())
+        else:
+            # Las imágenes sin puntuación quedan siempre al final
+            signo = -1 if orden == "Mayor simetría" else 1
+            rutas.sort(key=lambda r: (r not in self.puntuaciones, signo * self.puntuaciones.get(r, 0)))
+        
+        # Recolocar las tarjetas en el grid de 4 columnas
+        for tarjeta in self.tarjetas.values():
+            tarjeta.grid_forget()
+        for i, ruta in enumerate(rutas):
+            self.tarjetas[ruta].grid(row=i // 4, column=i % 4, padx=5, pady=5, sticky="nsew")
+        
+        self.etiqueta_conteo.configure(text=f"Mostrando {len(rutas)} de {len(self.tarjetas)} imágenes")
+        self.programar_miniaturas_visibles()
     
     def seleccionar_imagen(self, ruta_imagen):
         """
@@ -418,8 +893,18 @@ class InterfazSimetriaGatos:
             ttk.Label(self.imagen_frame, text=f"Archivo: {nombre_archivo}", 
                      font=("Arial", 12), background="#ffffff").pack(pady=5)
             
-            # Procesar la imagen
-            self.resultados_procesamiento = self.procesador.procesar_imagen_completa(ruta_imagen)
+            # Procesar la imagen, salvo que su resultado siga en la caché
+            clave = (ruta_imagen, self.metrica, os.path.getmtime(ruta_imagen))
+            self.resultados_procesamiento = self.cache_resultados.obtener(clave)
+            if self.resultados_procesamiento is None:
+                resultados = self.obtener_procesador().procesar_imagen_completa(ruta_imagen)
+                
+                # Guardar la puntuación en el índice y actualizar su miniatura
+                self.registrar_resultado(ruta_imagen, resultados)
+                
+                self.resultados_procesamiento = {k: v for k, v in resultados.items()
+                                                 if k not in CLAVES_NO_MOSTRADAS}
+                self.cache_resultados.guardar(clave, self.resultados_procesamiento)
             
             # Mostrar resultados del proceso
             self.mostrar_proceso()
@@ -446,10 +931,31 @@ class InterfazSimetriaGatos:
             ttk.Label(self.resultado_frame, text=f"Error al procesar la imagen: {str(e)}", 
                      foreground="red").pack(pady=20)
     
+    def registrar_resultado(self, ruta_imagen, resultados):
+        """
+        Guarda la puntuación de una imagen procesada en el índice de resultados.
+        
+        Args:
+            ruta_imagen (str): Ruta de la imagen.
+            resultados (dict): Resultados de procesar_imagen_completa.
+        """
+        caja = resultados['caja']
+        puntuacion = float(resultados['puntuacion_simetria'])
+        self.indice.registrar(ruta_imagen, {
+            'puntuacion_simetria': puntuacion,
+            'caja': caja,
+            'mapa_asimetria': resultados['mapa_asimetria'],
+            'caras': [{'caja': caja, 'puntuacion_simetria': puntuacion}] if caja is not None else []
+        }, metrica=self.metrica)
+        self.puntuaciones[ruta_imagen] = puntuacion
+        self.actualizar_puntuacion_miniatura(ruta_imagen)
+    
     def mostrar_proceso(self):
         """
         Muestra las imágenes del proceso de tratamiento.
         """
+        import cv2
+        
         # Limpiar frame anterior
         for widget in self.proceso_frame.winfo_children():
             widget.destroy()
@@ -497,6 +1003,10 @@ class InterfazSimetriaGatos:
             ('Filtro High Boost', 'filtro_highboost')
         ]
         
+        # Solo se muestran las etapas que aplica el perfil
+        imagenes_proceso = [(titulo, clave) for titulo, clave in imagenes_proceso
+                            if clave in self.resultados_procesamiento]
+        
         # Crear grid de imágenes
         for i, (titulo, clave) in enumerate(imagenes_proceso):
             # Calcular posición en el grid (3 columnas)
@@ -550,6 +1060,10 @@ class InterfazSimetriaGatos:
         Muestra el resultado del análisis de simetría con una imagen que ocupa el máximo espacio posible
         y un scrollbar para poder desplazarse verticalmente.
         """
+        import cv2
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        
         # Limpiar frame anterior
         for widget in self.resultado_frame.winfo_children():
             widget.destroy()
@@ -580,38 +1094,34 @@ class InterfazSimetriaGatos:
         main_canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-        # Crear figura para mostrar el resultado de simetría que ocupe el máximo espacio disponible
-        fig = plt.Figure(figsize=(16, 12), dpi=100)  # Ajustar dimensiones para maximizar visualización
-        fig.subplots_adjust(hspace=0.1, wspace=0.05, left=0.01, right=0.99, top=0.95, bottom=0.05)  # Usar todo el espacio disponible
-        
-        # Imagen con línea de simetría ocupando el máximo espacio horizontal disponible
-        fig = plt.figure(figsize=(15, 8))  # Ajustar tamaño de la figura
-        ax1 = fig.add_subplot(1, 1, 1)  # Cambiar a un solo gráfico que ocupe todo el espacio
+        # Imagen con línea de simetría y mapa de asimetría (si el perfil lo calcula), uno junto al otro.
+        # Se usa Figure y no plt.figure: pyplot conserva todas las figuras que crea
+        con_mapa = 'superposicion_asimetria' in self.resultados_procesamiento
+        fig = plt.Figure(figsize=(15, 8))  # Ajustar tamaño de la figura
+        ax1 = fig.add_subplot(1, 2 if con_mapa else 1, 1)
         img_simetria = cv2.cvtColor(self.resultados_procesamiento['imagen_simetria'], cv2.COLOR_BGR2RGB)
         ax1.imshow(img_simetria)  # Quitar aspect='equal' para permitir estirar la imagen
         ax1.set_title('Línea de Simetría', pad=20, fontsize=14, fontweight='bold')
         ax1.axis('off')
         
-        # Mostrar las mitades en una ventana separada o pestaña para que no afecten al tamaño 
-        # de la imagen principal y se puedan mostrar independientemente
+        # Mapa de calor por bloques: las zonas rojas son las más asimétricas
+        if con_mapa:
+            ax2 = fig.add_subplot(1, 2, 2)
+            img_asimetria = cv2.cvtColor(self.resultados_procesamiento['superposicion_asimetria'], cv2.COLOR_BGR2RGB)
+            ax2.imshow(img_asimetria)
+            ax2.set_title('Mapa de Asimetría', pad=20, fontsize=14, fontweight='bold')
+            ax2.axis('off')
         
-        # Guardar las mitades para mostrarlas cuando se solicite
-        self.mitad_izquierda = cv2.cvtColor(self.resultados_procesamiento['mitad_izquierda'], cv2.COLOR_BGR2RGB)
-        self.mitad_derecha = cv2.cvtColor(self.resultados_procesamiento['mitad_derecha'], cv2.COLOR_BGR2RGB)
+        # Mostrar las mitades en una ventana separada o pestaña para que no afecten al tamaño 
+        # de la imagen principal y se puedan mostrar independientemente. Se convierten
+        # al abrir la ventana, en lugar de guardar una copia de cada mitad
+        resultados = self.resultados_procesamiento
         
         # Puntuación de simetría
         puntuacion = self.resultados_procesamiento['puntuacion_simetria']
         
         # Determinar color y mensaje según puntuación
-        if puntuacion >= 80:
-            color = '#28a745'  # Verde más suave
-            mensaje = 'Alta simetría'
-        elif puntuacion >= 60:
-            color = '#ffc107'  # Amarillo más suave
-            mensaje = 'Simetría media'
-        else:
-            color = '#dc3545'  # Rojo más suave
-            mensaje = 'Baja simetría'
+        color, mensaje = clasificar_puntuacion(puntuacion)
         
         # Crear un frame para la puntuación con estilo
         puntuacion_frame = ttk.Frame(scrollable_frame, style='Card.TFrame')
@@ -648,13 +1158,13 @@ class InterfazSimetriaGatos:
             
             # Mitad izquierda
             ax_izq = fig_mitades.add_subplot(1, 2, 1)
-            ax_izq.imshow(self.mitad_izquierda)
+            ax_izq.imshow(cv2.cvtColor(resultados['mitad_izquierda'], cv2.COLOR_BGR2RGB))
             ax_izq.set_title('Mitad Izquierda', fontsize=14)
             ax_izq.axis('off')
             
             # Mitad derecha
             ax_der = fig_mitades.add_subplot(1, 2, 2)
-            ax_der.imshow(self.mitad_derecha)
+            ax_der.imshow(cv2.cvtColor(resultados['mitad_derecha'], cv2.COLOR_BGR2RGB))
             ax_der.set_title('Mitad Derecha', fontsize=14)
             ax_der.axis('off')
             
@@ -0,0 +1,111 @@
+"""
+Perfiles del pipeline: conjuntos con nombre de etapas y parámetros (detector,
+modo de puntuación, resoluciones de trabajo y filtros), definidos en un archivo
+JSON para ajustar rendimiento frente a calidad en cada despliegue.
+
+Este módulo no depende de OpenCV ni de NumPy para que la interfaz pueda leer
+los perfiles sin cargar el procesamiento.
+"""
+import os
+import copy
+import json
+import hashlib
+from configuracion import PESOS_PIRAMIDE
+
+RUTA_PERFILES_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfiles.json")
+
+PERFIL_DEFECTO = 'completo'
+
+# Modos de puntuación: 'completa' (cara recortada y ampliada en color, como
+# analizar_simetria) o 'rapida' (puntuar_rapido sobre una decodificación reducida)
+MODOS_PUNTUACION = ('completa', 'rapida')
+
+# Etapas de filtrado que puede activar un perfil, en el orden en que se muestran
+ETAPAS_FILTROS = ('gaussiano', 'laplaciano', 'gradiente', 'bilateral', 'mediana', 'highboost')
+
+REDUCCIONES = (1, 2, 4, 8)
+
+
+def validar_perfil(nombre, perfil):
+    """
+    Comprueba que un perfil tiene la estructura esperada.
+
+    Args:
+        nombre (str): Nombre del perfil (para los mensajes de error).
+        perfil (dict): Definición del perfil.
+    """
+    if not isinstance(perfil.get('detector', {}).get('nombre'), str):
+        raise ValueError(f"El perfil '{nombre}' debe indicar detector.nombre")
+    puntuacion = perfil.get('puntuacion', {})
+    if puntuacion.get('modo') not in MODOS_PUNTUACION:
+        raise ValueError(f"Modo de puntuación no válido en el perfil '{nombre}'. "
+                         f"Opciones: {', '.join(MODOS_PUNTUACION)}")
+    if puntuacion.get('reduccion', 1) not in REDUCCIONES:
+        raise ValueError(f"Reducción no válida en el perfil '{nombre}'. Opciones: {', '.join(map(str, REDUCCIONES))}")
+    niveles = puntuacion.get('niveles_piramide', 1)
+    if not isinstance(niveles, int) or isinstance(niveles, bool) or not 1 <= niveles <= len(PESOS_PIRAMIDE):
+        raise ValueError(f"niveles_piramide debe ser un entero entre 1 y {len(PESOS_PIRAMIDE)} "
+                         f"en el perfil '{nombre}'")
+    if not isinstance(puntuacion.get('normalizar_pose', False), bool):
+        raise ValueError(f"normalizar_pose debe ser true o false en el perfil '{nombre}'")
+    desconocidas = set(perfil.get('filtros', {})) - set(ETAPAS_FILTROS)
+    if desconocidas:
+        raise ValueError(f"Etapas desconocidas en el perfil '{nombre}': {', '.join(sorted(desconocidas))}")
+
+
+def cargar_perfiles(ruta=RUTA_PERFILES_DEFECTO):
+    """
+    Carga y valida los perfiles definidos en un archivo JSON.
+
+    Args:
+        ruta (str): Ruta del archivo de perfiles.
+
+    Returns:
+        dict: Diccionario {nombre: perfil}.
+    """
+    with open(ruta, encoding='utf-8') as f:
+        perfiles = json.load(f)
+    for nombre, perfil in perfiles.items():
+        validar_perfil(nombre, perfil)
+    return perfiles
+
+
+def obtener_perfil(nombre=PERFIL_DEFECTO, perfiles=None, detector=None):
+    """
+    Devuelve una copia de un perfil con su nombre incluido.
+
+    Args:
+        nombre (str): Nombre del perfil.
+        perfiles (dict): Perfiles ya cargados (por defecto, los del archivo por defecto).
+        detector (str): Si se indica, reemplaza el detector del perfil.
+
+    Returns:
+        dict: Perfil con la clave 'nombre'.
+    """
+    if perfiles is None:
+        perfiles = cargar_perfiles()
+    if nombre not in perfiles:
+        raise ValueError(f"Perfil no válido: '{nombre}'. Opciones: {', '.join(perfiles)}")
+    perfil = copy.deepcopy(perfiles[nombre])
+    perfil['nombre'] = nombre
+    if detector is not None and detector != perfil['detector']['nombre']:
+        # Los parámetros de un detector no sirven para otro
+        perfil['detector'] = {'nombre': detector}
+    return perfil
+
+
+def metrica_perfil(perfil):
+    """
+    Identificador de la métrica que produce un perfil, usado como clave de caché
+    en el índice de resultados: incluye el nombre y una huella de los parámetros,
+    de modo que al editar un perfil sus resultados anteriores dejan de usarse.
+
+    Args:
+        perfil (dict): Perfil devuelto por obtener_perfil.
+
+    Returns:
+        str: Por ejemplo, 'completo-1a2b3c4d'.
+    """
+    parametros = {k: v for k, v in perfil.items() if k not in ('nombre', 'descripcion')}
+    huella = hashlib.sha1(json.dumps(parametros, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{perfil['nombre']}-{huella[:8]}"
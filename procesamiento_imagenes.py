@@ -1,6 +1,90 @@
+import os
+import base64
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
+from configuracion import NIVELES_PIRAMIDE, PESOS_PIRAMIDE
+from detectores import DetectorCaras, crear_detector
+from perfiles import PERFIL_DEFECTO, obtener_perfil
+
+# Modos de decodificación reducida en escala de grises, por factor de reducción
+MODOS_GRIS_REDUCIDA = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8
+}
+
+LADO_MINIMO_PIRAMIDE = 8
+
+# Tamaño (filas, columnas) del mapa de asimetría: bloques de la mitad izquierda de la cara
+FORMA_MAPA_ASIMETRIA = (16, 8)
+
+# Normalización de pose: inclinación máxima buscada y paso de la búsqueda gruesa
+# (grados), lado de la miniatura sobre la que se estima y mejora mínima de la
+# puntuación (puntos porcentuales) para enderezar la cara
+ANGULO_MAXIMO_POSE = 30
+PASO_GRUESO_POSE = 5
+LADO_ESTIMACION_POSE = 48
+MEJORA_MINIMA_POSE = 1.0
+
+# Tareas independientes de procesar_imagen_completa (seis filtros y el análisis de simetría)
+NUM_TAREAS_FILTROS = 7
+
+# Etapas de filtrado de los perfiles: nombre -> (clave del resultado, método, argumentos fijos)
+METODOS_ETAPAS = {
+    'gaussiano': ('filtro_gaussiano', 'aplicar_filtro_gaussiano', {}),
+    'laplaciano': ('contornos_laplaciano', 'detectar_contornos_laplaciano', {}),
+    'gradiente': ('magnitud_gradiente', 'analisis_gradiente', {}),
+    'bilateral': ('filtro_bilateral', 'aplicar_filtro_bilateral', {}),
+    'mediana': ('filtro_mediana', 'aplicar_filtro_orden_estatico', {'tipo': 'mediana'}),
+    'highboost': ('filtro_highboost', 'aplicar_filtro_highboost', {})
+}
+
+def codificar_mapa_asimetria(mapa):
+    """
+    Codifica un mapa de asimetría (uint8 con forma FORMA_MAPA_ASIMETRIA) como texto
+    base64, para guardarlo junto a la puntuación en JSON o en el índice.
+    """
+    return base64.b64encode(np.ascontiguousarray(mapa, np.uint8).tobytes()).decode('ascii')
+
+
+def decodificar_mapa_asimetria(texto):
+    """
+    Recupera el mapa de asimetría codificado con codificar_mapa_asimetria.
+    """
+    return np.frombuffer(base64.b64decode(texto), np.uint8).reshape(FORMA_MAPA_ASIMETRIA)
+
+# Hilos de OpenCV mientras hay filtros aplicándose en paralelo: cv2.setNumThreads
+# es global, así que se cuenta cuántos pools de filtros lo están usando
+_lock_hilos_opencv = threading.Lock()
+_usos_hilos_opencv = 0
+_hilos_opencv_previos = None
+
+
+@contextmanager
+def _repartir_hilos_opencv(hilos_filtros):
+    """
+    Reparte los núcleos entre los hilos de los filtros: mientras dura el bloque,
+    cada operación de OpenCV usa como mucho núcleos // hilos_filtros hilos
+    internos, en lugar de que cada filtro lance un hilo por núcleo.
+    """
+    global _usos_hilos_opencv, _hilos_opencv_previos
+    with _lock_hilos_opencv:
+        if _usos_hilos_opencv == 0:
+            _hilos_opencv_previos = cv2.getNumThreads()
+            cv2.setNumThreads(max(1, (os.cpu_count() or 1) // hilos_filtros))
+        _usos_hilos_opencv += 1
+    try:
+        yield
+    finally:
+        with _lock_hilos_opencv:
+            _usos_hilos_opencv -= 1
+            if _usos_hilos_opencv == 0:
+                cv2.setNumThreads(_hilos_opencv_previos)
+
 
 class ProcesadorImagenes:
     """
@@ -8,9 +92,74 @@ class ProcesadorImagenes:
     Implementa varios filtros y técnicas de procesamiento de imágenes.
     """
     
-    def __init__(self):
-        # Cargar el clasificador para detección de caras de gatos
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalcatface.xml')
+    def __init__(self, detector=None, hilos_filtros=None, perfil=PERFIL_DEFECTO):
+        """
+        Args:
+            detector (str o DetectorCaras): Detector de caras de gatos, por nombre
+                ('haar', 'haar_extendido', 'lbp', 'dnn') o ya construido. Por
+                defecto, el del perfil. Su modelo se carga la primera vez que se usa.
+            hilos_filtros (int): Hilos con los que procesar_imagen_completa aplica
+                los filtros en paralelo (1 = en secuencia). Por defecto, uno por
+                filtro sin superar el número de núcleos, salvo que OpenCV esté
+                limitado a un hilo con cv2.setNumThreads(1), como en los procesos
+                de trabajo por lotes, en cuyo caso se aplican en secuencia.
+                Mientras los filtros se aplican en paralelo, los hilos internos
+                de OpenCV se reducen para repartir los núcleos entre ellos.
+            perfil (str o dict): Perfil del pipeline (ver perfiles.json), por nombre
+                o ya obtenido con perfiles.obtener_perfil.
+        """
+        if isinstance(detector, DetectorCaras):
+            nombre_detector = detector.nombre
+        else:
+            nombre_detector = detector
+        if isinstance(perfil, str):
+            perfil = obtener_perfil(perfil, detector=nombre_detector)
+        elif nombre_detector is not None and nombre_detector != perfil['detector']['nombre']:
+            perfil = dict(perfil, detector={'nombre': nombre_detector})
+        self.perfil = perfil
+        
+        if not isinstance(detector, DetectorCaras):
+            opciones = dict(perfil['detector'])
+            detector = crear_detector(opciones.pop('nombre'), **opciones)
+        self.detector = detector
+        self.hilos_filtros = hilos_filtros
+        self._pool_filtros = None
+        self._hilos_pool_filtros = 1
+        self._lock_pool = threading.Lock()
+        # Buffers preasignados por hilo para enderezar las caras
+        self._buffers = threading.local()
+    
+    def _obtener_pool_filtros(self):
+        """
+        Devuelve el pool de hilos de los filtros (creado en el primer uso), o None
+        si los filtros deben aplicarse en secuencia.
+        """
+        hilos = self.hilos_filtros
+        if hilos is None:
+            hilos = 1 if cv2.getNumThreads() <= 1 else min(NUM_TAREAS_FILTROS, os.cpu_count() or 1)
+        if hilos <= 1:
+            return None
+        with self._lock_pool:
+            if self._pool_filtros is None:
+                self._pool_filtros = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='filtros')
+                self._hilos_pool_filtros = hilos
+            return self._pool_filtros
+    
+    def cerrar(self):
+        """
+        Libera el pool de hilos de los filtros, si se llegó a crear.
+        """
+        with self._lock_pool:
+            if self._pool_filtros is not None:
+                self._pool_filtros.shutdown(wait=False)
+                self._pool_filtros = None
+    
+    def precargar(self):
+        """
+        Carga por adelantado el modelo del detector de caras (por ejemplo, desde un
+        hilo en segundo plano) para que la primera detección no tenga que esperarlo.
+        """
+        self.detector.cargar()
     
     def cargar_imagen(self, ruta_imagen):
         """
@@ -27,6 +176,72 @@ class ProcesadorImagenes:
             raise ValueError(f"No se pudo cargar la imagen desde {ruta_imagen}")
         return imagen
     
+    def decodificar_imagen(self, datos):
+        """
+        Decodifica una imagen a partir de sus bytes en memoria (JPG, PNG, BMP...).
+        
+        Args:
+            datos (bytes): Contenido del archivo de imagen.
+            
+        Returns:
+            numpy.ndarray: Imagen decodificada en formato BGR.
+        """
+        imagen = cv2.imdecode(np.frombuffer(datos, np.uint8), cv2.IMREAD_COLOR)
+        if imagen is None:
+            raise ValueError("No se pudo decodificar la imagen recibida")
+        return imagen
+    
+    def localizar_caras(self, imagen):
+        """
+        Localiza las caras de gato presentes en la imagen.
+        
+        Args:
+            imagen (numpy.ndarray): Imagen en formato BGR o en escala de grises.
+            
+        Returns:
+            list: Lista de cajas (x, y, w, h), una por cara detectada.
+        """
+        return self.detector.detectar(imagen)
+    
+    def limites_region(self, imagen, caja):
+        """
+        Límites (x_inicio, y_inicio, x_fin, y_fin) de la región de la cara con un
+        margen adicional del 20%, recortados a los bordes de la imagen.
+        """
+        x, y, w, h = caja
+        margen = int(0.2 * max(w, h))  # 20% de margen
+        return (max(0, x - margen), max(0, y - margen),
+                min(imagen.shape[1], x + w + margen), min(imagen.shape[0], y + h + margen))
+    
+    def recortar_cara(self, imagen, caja, factor_escala=None, angulo=0.0):
+        """
+        Extrae la región de la cara con un margen adicional y la agranda.
+        
+        Args:
+            imagen (numpy.ndarray): Imagen en formato BGR.
+            caja (tuple): Caja (x, y, w, h) de la cara detectada.
+            factor_escala (float): Factor de ampliación de la región recortada
+                (por defecto, el del perfil).
+            angulo (float): Si no es 0, la región se endereza girándola este ángulo
+                (ver estimar_rotacion) en el mismo paso que se agranda.
+            
+        Returns:
+            numpy.ndarray: Región de la cara agrandada.
+        """
+        if factor_escala is None:
+            factor_escala = self.perfil['puntuacion'].get('factor_escala', 2.0)
+        if angulo:
+            return self.enderezar_region(imagen, caja, angulo, factor_escala)
+        
+        # Extraer y agrandar la región de la cara (con un margen adicional)
+        x_start, y_start, x_end, y_end = self.limites_region(imagen, caja)
+        
+        cara_recortada = imagen[y_start:y_end, x_start:x_end]
+        
+        # Redimensionar la cara para que sea más grande
+        altura, ancho = cara_recortada.shape[:2]
+        return cv2.resize(cara_recortada, (int(ancho * factor_escala), int(altura * factor_escala)))
+    
     def detectar_cara_gato(self, imagen):
         """
         Detecta la cara del gato en la imagen, la centra y la acerca.
@@ -37,41 +252,43 @@ class ProcesadorImagenes:
         Returns:
             tuple: (imagen_procesada, imagen_original_con_rectangulo)
         """
-        # Convertir a escala de grises para la detección
-        gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        cara_agrandada, imagen_con_rectangulo, _ = self._detectar_cara(imagen)
+        return cara_agrandada, imagen_con_rectangulo
+    
+    def _detectar_cara(self, imagen):
+        """
+        Implementación de detectar_cara_gato que además devuelve la caja (x, y, w, h)
+        de la cara detectada, o None si no se detectó ninguna.
+        """
+        caras = self.localizar_caras(imagen)
         
-        # Detectar caras de gatos
-        caras = self.face_cascade.detectMultiScale(gris, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        # Tomar la primera cara detectada
+        caja = caras[0] if len(caras) > 0 else None
+        cara_agrandada, imagen_con_rectangulo = self._marcar_cara(imagen, caja, self.angulo_pose(imagen, caja))
+        return cara_agrandada, imagen_con_rectangulo, caja
+    
+    def _marcar_cara(self, imagen, caja, angulo=0.0):
+        """
+        Recorta y agranda la cara de una caja ya detectada y dibuja la caja sobre
+        una copia de la imagen. Sin caja devuelve la imagen original.
         
+        Returns:
+            tuple: (cara_agrandada, imagen_con_rectangulo)
+        """
         # Crear una copia de la imagen original para dibujar el rectángulo
         imagen_con_rectangulo = imagen.copy()
         
-        if len(caras) > 0:
-            # Tomar la primera cara detectada
-            x, y, w, h = caras[0]
-            
-            # Dibujar un rectángulo alrededor de la cara en la imagen original
-            cv2.rectangle(imagen_con_rectangulo, (x, y), (x+w, y+h), (0, 255, 0), 2)
-            
-            # Extraer y agrandar la región de la cara (con un margen adicional)
-            margen = int(0.2 * max(w, h))  # 20% de margen
-            x_start = max(0, x - margen)
-            y_start = max(0, y - margen)
-            x_end = min(imagen.shape[1], x + w + margen)
-            y_end = min(imagen.shape[0], y + h + margen)
-            
-            cara_recortada = imagen[y_start:y_end, x_start:x_end]
-            
-            # Redimensionar la cara para que sea más grande
-            altura, ancho = cara_recortada.shape[:2]
-            factor_escala = 2.0  # Hacer la cara 2 veces más grande
-            cara_agrandada = cv2.resize(cara_recortada, (int(ancho * factor_escala), int(altura * factor_escala)))
-            
-            return cara_agrandada, imagen_con_rectangulo
-        else:
+        if caja is None:
             # Si no se detecta ninguna cara, devolver la imagen original
             print("No se detectó ninguna cara de gato en la imagen.")
             return imagen, imagen_con_rectangulo
+        
+        # Dibujar un rectángulo alrededor de la cara en la imagen original
+        x, y, w, h = caja
+        cv2.rectangle(imagen_con_rectangulo, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        
+        # Hacer la cara 2 veces más grande (y enderezarla, si el perfil lo indica)
+        return self.recortar_cara(imagen, caja, angulo=angulo), imagen_con_rectangulo
     
     def aplicar_filtro_gaussiano(self, imagen, tamano_kernel=5, sigma=0):
         """
@@ -233,6 +450,14 @@ class ProcesadorImagenes:
         Returns:
             tuple: (imagen_con_linea_simetria, puntuacion_simetria, mitad_izquierda, mitad_derecha)
         """
+        return self._analizar_simetria(imagen)[:4]
+    
+    def _analizar_simetria(self, imagen, puntuacion_texto=None):
+        """
+        Implementación de analizar_simetria que además devuelve la diferencia
+        absoluta por píxel entre la mitad izquierda y la derecha volteada. Si se
+        indica puntuacion_texto, es la puntuación que se escribe sobre la imagen.
+        """
         # Convertir a escala de grises si es necesario
         if len(imagen.shape) == 3:
             gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
@@ -273,18 +498,59 @@ class ProcesadorImagenes:
         cv2.line(imagen_con_linea, (linea_central, 0), (linea_central, altura), (0, 255, 0), 2)
         
         # Añadir texto con la puntuación de simetría
-        texto = f"Simetria: {puntuacion_simetria_porcentaje:.1f}%"
+        if puntuacion_texto is None:
+            puntuacion_texto = puntuacion_simetria_porcentaje
+        texto = f"Simetria: {puntuacion_texto:.1f}%"
         cv2.putText(imagen_con_linea, texto, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
         
         # Crear imágenes a color para las mitades
         mitad_izquierda_color = cv2.cvtColor(mitad_izquierda, cv2.COLOR_GRAY2BGR)
         mitad_derecha_color = cv2.cvtColor(mitad_derecha, cv2.COLOR_GRAY2BGR)
         
-        return imagen_con_linea, puntuacion_simetria_porcentaje, mitad_izquierda_color, mitad_derecha_color
+        return imagen_con_linea, puntuacion_simetria_porcentaje, mitad_izquierda_color, mitad_derecha_color, diferencia
+    
+    def mapa_asimetria(self, diferencia):
+        """
+        Reduce la diferencia por píxel entre las dos mitades a un mapa por bloques
+        (media de cada bloque, cuantizada a uint8) de tamaño fijo FORMA_MAPA_ASIMETRIA.
+        
+        Args:
+            diferencia (numpy.ndarray): Diferencia absoluta entre la mitad izquierda
+                y la mitad derecha volteada, en escala de grises.
+            
+        Returns:
+            numpy.ndarray: Mapa uint8 de la mitad izquierda (mayor valor = más asimetría).
+        """
+        filas, columnas = FORMA_MAPA_ASIMETRIA
+        return cv2.resize(diferencia, (columnas, filas), interpolation=cv2.INTER_AREA)
+    
+    def superponer_mapa_asimetria(self, imagen, mapa, opacidad=0.5):
+        """
+        Superpone el mapa de asimetría, reflejado a ambas mitades, sobre la cara.
+        La escala de color se normaliza en cada imagen para resaltar dónde se
+        concentra la asimetría.
+        
+        Args:
+            imagen (numpy.ndarray): Cara en formato BGR o escala de grises.
+            mapa (numpy.ndarray): Mapa devuelto por mapa_asimetria.
+            opacidad (float): Peso del mapa de calor en la mezcla.
+            
+        Returns:
+            numpy.ndarray: Imagen BGR con el mapa de calor superpuesto.
+        """
+        if len(imagen.shape) == 2:
+            imagen = cv2.cvtColor(imagen, cv2.COLOR_GRAY2BGR)
+        altura, ancho = imagen.shape[:2]
+        
+        mapa_completo = np.hstack([mapa, mapa[:, ::-1]])
+        mapa_completo = cv2.normalize(mapa_completo, None, 0, 255, cv2.NORM_MINMAX)
+        mapa_completo = cv2.resize(mapa_completo, (ancho, altura), interpolation=cv2.INTER_NEAREST)
+        mapa_color = cv2.applyColorMap(mapa_completo, cv2.COLORMAP_JET)
+        return cv2.addWeighted(imagen, 1 - opacidad, mapa_color, opacidad, 0)
     
     def procesar_imagen_completa(self, ruta_imagen):
         """
-        Procesa una imagen aplicando todos los filtros y análisis.
+        Procesa una imagen aplicando las etapas de filtrado y el análisis del perfil.
         
         Args:
             ruta_imagen (str): Ruta de la imagen a procesar.
@@ -295,35 +561,514 @@ class ProcesadorImagenes:
         # Cargar imagen
         imagen_original = self.cargar_imagen(ruta_imagen)
         
-        # Detectar y centrar cara de gato
-        cara_gato, imagen_con_rectangulo = self.detectar_cara_gato(imagen_original)
+        # En modo rápido la puntuación es la del perfil (la misma que en los lotes) y
+        # la cara que se muestra es la de esa misma detección, con su caja llevada a
+        # la imagen original; las imágenes de la cara ampliada solo se usan para la
+        # visualización. En otro caso, detectar y centrar la cara del gato
+        resultado_perfil = None
+        if self.perfil['puntuacion']['modo'] == 'rapida':
+            resultado_perfil = self.puntuar_segun_perfil(self.cargar_para_puntuar(ruta_imagen))
+            caja_cara = resultado_perfil['caja']
+            cara_gato, imagen_con_rectangulo = self._marcar_cara(imagen_original, caja_cara,
+                                                                 resultado_perfil.get('angulo_pose', 0.0))
+        else:
+            cara_gato, imagen_con_rectangulo, caja_cara = self._detectar_cara(imagen_original)
+        puntuacion_texto = resultado_perfil['puntuacion_simetria'] if resultado_perfil else None
         
-        # Aplicar todos los filtros a la cara del gato
-        filtro_gaussiano = self.aplicar_filtro_gaussiano(cara_gato)
-        contornos_laplaciano = self.detectar_contornos_laplaciano(cara_gato)
-        magnitud_gradiente, _ = self.analisis_gradiente(cara_gato)
-        filtro_bilateral = self.aplicar_filtro_bilateral(cara_gato)
-        filtro_mediana = self.aplicar_filtro_orden_estatico(cara_gato, tipo='mediana')
-        filtro_highboost = self.aplicar_filtro_highboost(cara_gato)
+        # Aplicar los filtros del perfil y el análisis de simetría a la cara del gato.
+        # Son independientes entre sí, así que se reparten entre hilos si hay pool
+        # (OpenCV libera el GIL durante cada operación)
+        claves, tareas = [], []
+        for etapa, parametros in self.perfil.get('filtros', {}).items():
+            clave, metodo, fijos = METODOS_ETAPAS[etapa]
+            claves.append(clave)
+            tareas.append(lambda img, metodo=metodo, opciones={**fijos, **parametros}:
+                          getattr(self, metodo)(img, **opciones))
+        claves.append('simetria')
+        tareas.append(lambda img: self._analizar_simetria(img, puntuacion_texto))
         
-        # Analizar simetría
-        imagen_simetria, puntuacion_simetria, mitad_izq, mitad_der = self.analizar_simetria(cara_gato)
+        pool = self._obtener_pool_filtros()
+        if pool is not None:
+            # Sin repartir los núcleos, cada filtro usaría además el pool interno
+            # de OpenCV completo y se sobresuscribiría la CPU
+            with _repartir_hilos_opencv(self._hilos_pool_filtros):
+                salidas = dict(zip(claves, pool.map(lambda tarea: tarea(cara_gato), tareas)))
+        else:
+            salidas = {clave: tarea(cara_gato) for clave, tarea in zip(claves, tareas)}
+        imagen_simetria, puntuacion_simetria, mitad_izq, mitad_der, diferencia = salidas.pop('simetria')
         
         # Crear un diccionario con todas las imágenes procesadas
         resultados = {
             'original': imagen_original,
             'deteccion_cara': imagen_con_rectangulo,
             'cara_gato': cara_gato,
-            'filtro_gaussiano': filtro_gaussiano,
-            'contornos_laplaciano': cv2.cvtColor(contornos_laplaciano, cv2.COLOR_GRAY2BGR) if len(contornos_laplaciano.shape) == 2 else contornos_laplaciano,
-            'magnitud_gradiente': cv2.cvtColor(magnitud_gradiente, cv2.COLOR_GRAY2BGR) if len(magnitud_gradiente.shape) == 2 else magnitud_gradiente,
-            'filtro_bilateral': filtro_bilateral,
-            'filtro_mediana': filtro_mediana,
-            'filtro_highboost': filtro_highboost,
             'imagen_simetria': imagen_simetria,
             'mitad_izquierda': mitad_izq,
             'mitad_derecha': mitad_der,
-            'puntuacion_simetria': puntuacion_simetria
+            'puntuacion_simetria': puntuacion_simetria,
+            'mapa_asimetria': None,
+            'caja': list(caja_cara) if caja_cara is not None else None
+        }
+        for clave, salida in salidas.items():
+            if clave == 'magnitud_gradiente':
+                salida = salida[0]
+            # Las salidas en escala de grises se muestran como BGR
+            resultados[clave] = cv2.cvtColor(salida, cv2.COLOR_GRAY2BGR) if len(salida.shape) == 2 else salida
+        
+        if self.perfil.get('mapa_asimetria', True):
+            # El mapa que se superpone es el mismo que se guarda: en modo rápido, el
+            # de la puntuación del perfil (decodificado); en otro caso, el de la cara mostrada
+            if resultado_perfil is not None:
+                resultados['mapa_asimetria'] = resultado_perfil['mapa_asimetria']
+                mapa = decodificar_mapa_asimetria(resultados['mapa_asimetria'])
+            else:
+                mapa = self.mapa_asimetria(diferencia)
+                resultados['mapa_asimetria'] = codificar_mapa_asimetria(mapa)
+            resultados['superposicion_asimetria'] = self.superponer_mapa_asimetria(cara_gato, mapa)
+        
+        if resultado_perfil is not None:
+            resultados['puntuacion_simetria'] = resultado_perfil['puntuacion_simetria']
+            if 'puntuaciones_escala' in resultado_perfil:
+                resultados['puntuaciones_escala'] = resultado_perfil['puntuaciones_escala']
+        
+        return resultados
+    
+    def puntuar_imagen(self, imagen, incluir_imagenes=False):
+        """
+        Calcula únicamente la detección y la puntuación de simetría de una imagen,
+        sin aplicar los filtros de visualización.
+        
+        Args:
+            imagen (numpy.ndarray): Imagen en formato BGR.
+            incluir_imagenes (bool): Si es True, añade las imágenes 'deteccion_cara'
+                e 'imagen_simetria' de la cara principal al resultado.
+            
+        Returns:
+            dict: Puntuación y mapa de asimetría codificado de la cara principal, su
+                caja (o None si no hay cara) y la lista de caras con su caja,
+                puntuación y mapa individuales. Si el perfil normaliza la pose,
+                cada cara se endereza antes de puntuarla y se añade 'angulo_pose'.
+        """
+        caras = self.localizar_caras(imagen)
+        normalizar_pose = self.perfil['puntuacion'].get('normalizar_pose', False)
+        factor_escala = self.perfil['puntuacion'].get('factor_escala', 2.0)
+        
+        resultados_caras = []
+        for caja in caras:
+            angulo = self.angulo_pose(imagen, caja)
+            if angulo:
+                # La cara enderezada solo se usa para puntuar: se escribe en el buffer del hilo
+                cara = self.enderezar_region(imagen, caja, angulo, factor_escala, en_buffer=True)
+            else:
+                cara = self.recortar_cara(imagen, caja)
+            _, puntuacion, _, _, diferencia = self._analizar_simetria(cara)
+            resultado_cara = {'caja': list(caja), 'puntuacion_simetria': float(puntuacion),
+                              'mapa_asimetria': codificar_mapa_asimetria(self.mapa_asimetria(diferencia))}
+            if normalizar_pose:
+                resultado_cara['angulo_pose'] = angulo
+            resultados_caras.append(resultado_cara)
+        
+        if resultados_caras:
+            # La cara principal es la primera detectada, igual que en detectar_cara_gato
+            resultado = dict(resultados_caras[0])
+        else:
+            # Sin cara detectada se analiza la imagen completa
+            _, puntuacion_principal, _, _, diferencia = self._analizar_simetria(imagen)
+            resultado = {'puntuacion_simetria': float(puntuacion_principal), 'caja': None,
+                         'mapa_asimetria': codificar_mapa_asimetria(self.mapa_asimetria(diferencia))}
+        resultado['caras'] = resultados_caras
+        
+        if incluir_imagenes:
+            resultado.update(self._previsualizaciones(imagen, resultado['caja'], resultado['puntuacion_simetria'],
+                                                      resultado.get('angulo_pose', 0.0)))
+        
+        return resultado
+    
+    def _previsualizaciones(self, imagen, caja, puntuacion, angulo=0.0):
+        """
+        Genera las imágenes 'deteccion_cara' e 'imagen_simetria' de la cara principal.
+        """
+        imagen_con_rectangulo = imagen.copy()
+        if caja is not None:
+            x, y, w, h = caja
+            cv2.rectangle(imagen_con_rectangulo, (x, y), (x+w, y+h), (0, 255, 0), 2)
+            cara = self.recortar_cara(imagen, caja, angulo=angulo)
+        else:
+            cara = imagen
+        return {
+            'deteccion_cara': imagen_con_rectangulo,
+            'imagen_simetria': self._analizar_simetria(cara, puntuacion)[0]
         }
+    
+    def cargar_para_puntuar(self, ruta_imagen):
+        """
+        Carga una imagen en la forma que necesita puntuar_segun_perfil: en modo
+        rápido, directamente en escala de grises y reducida; en otro caso, en BGR
+        a tamaño completo. La forma depende solo del perfil, de modo que la
+        puntuación de una imagen no cambia si se piden previsualizaciones.
+        
+        Args:
+            ruta_imagen (str): Ruta de la imagen a cargar.
+            
+        Returns:
+            numpy.ndarray: Imagen cargada.
+        """
+        puntuacion = self.perfil['puntuacion']
+        if puntuacion['modo'] == 'rapida':
+            return self.cargar_gris_reducida(ruta_imagen, puntuacion.get('reduccion', 1))
+        return self.cargar_imagen(ruta_imagen)
+    
+    def decodificar_para_puntuar(self, datos):
+        """
+        Equivalente a cargar_para_puntuar para bytes en memoria.
+        """
+        puntuacion = self.perfil['puntuacion']
+        if puntuacion['modo'] == 'rapida':
+            return self.decodificar_gris_reducida(datos, puntuacion.get('reduccion', 1))
+        return self.decodificar_imagen(datos)
+    
+    def puntuar_segun_perfil(self, imagen, incluir_imagenes=False, imagen_color=None):
+        """
+        Calcula la puntuación de simetría con el modo y los parámetros del perfil.
+        
+        Args:
+            imagen (numpy.ndarray): Imagen obtenida con cargar_para_puntuar o
+                decodificar_para_puntuar.
+            incluir_imagenes (bool): Ver puntuar_imagen.
+            imagen_color (numpy.ndarray): Imagen BGR a tamaño completo sobre la que
+                se dibujan las previsualizaciones cuando 'imagen' está en escala de
+                grises (modo rápido). Solo se usa para dibujar, nunca para puntuar.
+            
+        Returns:
+            dict: Mismo formato que puntuar_imagen; en modo rápido con pirámide,
+                también 'puntuaciones_escala'.
+        """
+        puntuacion = self.perfil['puntuacion']
+        incluir_mapa = self.perfil.get('mapa_asimetria', True)
+        if puntuacion['modo'] != 'rapida':
+            resultado = self.puntuar_imagen(imagen, incluir_imagenes)
+            if not incluir_mapa:
+                for r in [resultado] + resultado['caras']:
+                    r.pop('mapa_asimetria')
+            return resultado
+        
+        if len(imagen.shape) == 3:
+            raise ValueError("En modo rápido se puntúa la imagen en escala de grises de cargar_para_puntuar; "
+                             "la imagen en color se pasa como imagen_color")
+        if incluir_imagenes and imagen_color is None:
+            raise ValueError("Las previsualizaciones en modo rápido requieren imagen_color")
+        resultado = self.puntuar_rapido(imagen, puntuacion.get('reduccion', 1), puntuacion.get('niveles_piramide', 1),
+                                        incluir_mapa, puntuacion.get('normalizar_pose', False))
+        if incluir_imagenes:
+            # Las cajas ya están en coordenadas de la imagen original
+            resultado.update(self._previsualizaciones(imagen_color, resultado['caja'],
+                                                      resultado['puntuacion_simetria'],
+                                                      resultado.get('angulo_pose', 0.0)))
+        return resultado
+    
+    def puntuar_lote(self, imagenes, incluir_imagenes=False, imagenes_color=None):
+        """
+        Calcula la puntuación de simetría de un lote de imágenes reutilizando
+        el mismo clasificador ya cargado, según el perfil.
+        
+        Args:
+            imagenes (list): Lista de imágenes obtenidas con cargar_para_puntuar
+                o decodificar_para_puntuar.
+            incluir_imagenes (bool): Ver puntuar_imagen.
+            imagenes_color (list): Imágenes BGR para las previsualizaciones en
+                modo rápido (ver puntuar_segun_perfil), en el mismo orden.
+            
+        Returns:
+            list: Un diccionario de resultados por imagen, en el mismo orden.
+        """
+        imagenes_color = imagenes_color or [None] * len(imagenes)
+        return [self.puntuar_segun_perfil(imagen, incluir_imagenes, color)
+                for imagen, color in zip(imagenes, imagenes_color)]
+    
+    def cargar_gris_reducida(self, ruta_imagen, reduccion=2):
+        """
+        Carga una imagen en escala de grises decodificándola directamente a un
+        tamaño reducido (el decodificador JPEG omite el trabajo innecesario).
         
-        return resultados
\ No newline at end of file
+        Args:
+            ruta_imagen (str): Ruta de la imagen a cargar.
+            reduccion (int): Factor de reducción (1, 2, 4 u 8).
+            
+        Returns:
+            numpy.ndarray: Imagen en escala de grises.
+        """
+        if reduccion not in MODOS_GRIS_REDUCIDA:
+            raise ValueError(f"Reducción no válida. Opciones: {', '.join(map(str, MODOS_GRIS_REDUCIDA))}")
+        gris = cv2.imread(ruta_imagen, MODOS_GRIS_REDUCIDA[reduccion])
+        if gris is None:
+            raise ValueError(f"No se pudo cargar la imagen desde {ruta_imagen}")
+        return gris
+    
+    def decodificar_gris_reducida(self, datos, reduccion=2):
+        """
+        Equivalente a cargar_gris_reducida para bytes en memoria.
+        """
+        if reduccion not in MODOS_GRIS_REDUCIDA:
+            raise ValueError(f"Reducción no válida. Opciones: {', '.join(map(str, MODOS_GRIS_REDUCIDA))}")
+        gris = cv2.imdecode(np.frombuffer(datos, np.uint8), MODOS_GRIS_REDUCIDA[reduccion])
+        if gris is None:
+            raise ValueError("No se pudo decodificar la imagen recibida")
+        return gris
+    
+    def region_cara(self, imagen, caja):
+        """
+        Devuelve una vista (sin copia) de la región de la cara con el mismo margen
+        que recortar_cara, o la imagen completa si la caja es None.
+        """
+        if caja is None:
+            return imagen
+        x_inicio, y_inicio, x_fin, y_fin = self.limites_region(imagen, caja)
+        return imagen[y_inicio:y_fin, x_inicio:x_fin]
+    
+    def _buffer(self, nombre, forma, tipo=np.uint8):
+        """
+        Devuelve un array con la forma indicada sobre un buffer preasignado del hilo
+        actual, que solo se amplía cuando no cabe. Su contenido es válido hasta la
+        siguiente llamada con el mismo nombre desde el mismo hilo.
+        """
+        tamano = int(np.prod(forma))
+        buffer = getattr(self._buffers, nombre, None)
+        if buffer is None or buffer.size < tamano or buffer.dtype != tipo:
+            buffer = np.empty(tamano, tipo)
+            setattr(self._buffers, nombre, buffer)
+        return buffer[:tamano].reshape(forma)
+    
+    def estimar_rotacion(self, imagen, caja, angulo_maximo=ANGULO_MAXIMO_POSE):
+        """
+        Estima la inclinación en el plano de una cara como el giro que maximiza su
+        simetría especular. La búsqueda (primero cada PASO_GRUESO_POSE grados y
+        después grado a grado) se hace sobre una miniatura suavizada de la región
+        y de su entorno, girada igual que en enderezar_region, por lo que cuesta
+        del orden de un milisegundo por cara. Como optimiza la misma métrica que
+        se puntúa, sesga la puntuación al alza; por eso ningún perfil incluido
+        activa 'normalizar_pose'.
+        
+        Args:
+            imagen (numpy.ndarray): Imagen en formato BGR o escala de grises.
+            caja (tuple): Caja (x, y, w, h) de la cara.
+            angulo_maximo (int): Inclinación máxima buscada, en grados.
+            
+        Returns:
+            float: Ángulo en grados (sentido de cv2.getRotationMatrix2D) que endereza
+                la cara, o 0.0 si girarla no mejora la simetría al menos
+                MEJORA_MINIMA_POSE puntos o si el mejor giro es el límite de la búsqueda.
+        """
+        x_inicio, y_inicio, x_fin, y_fin = self.limites_region(imagen, caja)
+        lado = max(x_fin - x_inicio, y_fin - y_inicio)
+        if min(x_fin - x_inicio, y_fin - y_inicio) < LADO_MINIMO_PIRAMIDE:
+            return 0.0
+        
+        # Entorno de la región: al girarla, sus esquinas se toman de la imagen real
+        margen = lado // 4
+        cx_inicio, cy_inicio = max(0, x_inicio - margen), max(0, y_inicio - margen)
+        cx_fin, cy_fin = min(imagen.shape[1], x_fin + margen), min(imagen.shape[0], y_fin + margen)
+        escala = min(1.0, LADO_ESTIMACION_POSE / lado)
+        miniatura = cv2.resize(imagen[cy_inicio:cy_fin, cx_inicio:cx_fin],
+                               (max(1, round((cx_fin - cx_inicio) * escala)), max(1, round((cy_fin - cy_inicio) * escala))),
+                               interpolation=cv2.INTER_AREA)
+        if len(miniatura.shape) == 3:
+            miniatura = cv2.cvtColor(miniatura, cv2.COLOR_BGR2GRAY)
+        miniatura = cv2.GaussianBlur(miniatura, (3, 3), 0)
+        
+        # Región y su centro en coordenadas de la miniatura
+        escala_x = miniatura.shape[1] / (cx_fin - cx_inicio)
+        escala_y = miniatura.shape[0] / (cy_fin - cy_inicio)
+        ancho = max(2, round((x_fin - x_inicio) * escala_x))
+        alto = max(1, round((y_fin - y_inicio) * escala_y))
+        centro = (((x_inicio + x_fin - 1) / 2 - cx_inicio) * escala_x,
+                  ((y_inicio + y_fin - 1) / 2 - cy_inicio) * escala_y)
+        girada = self._buffer('estimacion_pose', (alto, ancho))
+        
+        def puntuacion(angulo):
+            matriz = cv2.getRotationMatrix2D(centro, float(angulo), 1.0)
+            matriz[0, 2] += (ancho - 1) / 2 - centro[0]
+            matriz[1, 2] += (alto - 1) / 2 - centro[1]
+            cv2.warpAffine(miniatura, matriz, (ancho, alto), dst=girada, borderMode=cv2.BORDER_REPLICATE)
+            return self.puntuacion_espejo(girada)
+        
+        gruesos = range(-angulo_maximo, angulo_maximo + 1, PASO_GRUESO_POSE)
+        mejor = max(gruesos, key=puntuacion)
+        finos = range(max(-angulo_maximo, mejor - PASO_GRUESO_POSE + 1),
+                      min(angulo_maximo, mejor + PASO_GRUESO_POSE - 1) + 1)
+        mejor = max(finos, key=puntuacion)
+        
+        # Un máximo en el límite de la búsqueda no es una inclinación fiable
+        if mejor == 0 or abs(mejor) >= angulo_maximo or puntuacion(mejor) - puntuacion(0) < MEJORA_MINIMA_POSE:
+            return 0.0
+        return float(mejor)
+    
+    def angulo_pose(self, imagen, caja):
+        """
+        Ángulo con el que enderezar la cara de la caja según el perfil: el estimado
+        con estimar_rotacion si el perfil activa 'normalizar_pose', o 0.0.
+        """
+        if caja is None or not self.perfil['puntuacion'].get('normalizar_pose', False):
+            return 0.0
+        return self.estimar_rotacion(imagen, caja)
+    
+    def enderezar_region(self, imagen, caja, angulo, factor_escala=1.0, en_buffer=False):
+        """
+        Extrae la región de la cara (con el margen de recortar_cara) girada y
+        escalada en un único warpAffine sobre la imagen completa, de modo que las
+        esquinas se rellenan con los píxeles reales que rodean la región.
+        
+        Args:
+            imagen (numpy.ndarray): Imagen en formato BGR o escala de grises.
+            caja (tuple): Caja (x, y, w, h) de la cara.
+            angulo (float): Giro en grados (ver estimar_rotacion).
+            factor_escala (float): Factor de ampliación de la región.
+            en_buffer (bool): Si es True, escribe el resultado en un buffer
+                preasignado del hilo (válido hasta la siguiente llamada) en lugar
+                de reservar memoria nueva.
+            
+        Returns:
+            numpy.ndarray: Región enderezada.
+        """
+        x_inicio, y_inicio, x_fin, y_fin = self.limites_region(imagen, caja)
+        ancho = int((x_fin - x_inicio) * factor_escala)
+        alto = int((y_fin - y_inicio) * factor_escala)
+        
+        # Girar y escalar alrededor del centro de la región y llevarlo al centro de la salida
+        centro = ((x_inicio + x_fin - 1) / 2, (y_inicio + y_fin - 1) / 2)
+        matriz = cv2.getRotationMatrix2D(centro, angulo, factor_escala)
+        matriz[0, 2] += (ancho - 1) / 2 - centro[0]
+        matriz[1, 2] += (alto - 1) / 2 - centro[1]
+        
+        destino = self._buffer('region_enderezada', (alto, ancho) + imagen.shape[2:], imagen.dtype) if en_buffer else None
+        return cv2.warpAffine(imagen, matriz, (ancho, alto), dst=destino,
+                              flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    
+    def diferencia_espejo(self, gris):
+        """
+        Diferencia absoluta entre la mitad izquierda y la mitad derecha volteada.
+        La mitad derecha se voltea con cv2.flip en un buffer preasignado del hilo
+        y la diferencia se calcula sobre ese mismo buffer, de modo que no se
+        reserva memoria por imagen. Con ancho impar se descarta la columna
+        central, igual que en analizar_simetria.
+        
+        Args:
+            gris (numpy.ndarray): Imagen (o vista) en escala de grises.
+            
+        Returns:
+            numpy.ndarray: Diferencia de la mitad izquierda, válida hasta la
+                siguiente llamada desde el mismo hilo.
+        """
+        altura, ancho = gris.shape
+        mitad = ancho // 2
+        diferencia = self._buffer('diferencia_espejo', (altura, mitad), gris.dtype)
+        if diferencia.size:
+            cv2.flip(gris[:, ancho - mitad:], 1, dst=diferencia)
+            cv2.absdiff(gris[:, :mitad], diferencia, dst=diferencia)
+        return diferencia
+    
+    @staticmethod
+    def puntuacion_diferencia(diferencia):
+        """
+        Convierte la diferencia devuelta por diferencia_espejo en una puntuación
+        de simetría en porcentaje (100% = simetría perfecta).
+        """
+        if diferencia.size == 0:
+            return 100.0
+        diferencia_media = cv2.sumElems(diferencia)[0] / diferencia.size
+        return max(0.0, 100 - diferencia_media / 2.55)
+    
+    def puntuacion_espejo(self, gris):
+        """
+        Compara la mitad izquierda con la derecha volteada con una sola pasada
+        de diferencia (ver diferencia_espejo) y una suma.
+        
+        Args:
+            gris (numpy.ndarray): Imagen (o vista) en escala de grises.
+            
+        Returns:
+            float: Puntuación de simetría en porcentaje (100% = simetría perfecta).
+        """
+        return self.puntuacion_diferencia(self.diferencia_espejo(gris))
+    
+    def analizar_simetria_piramide(self, imagen, niveles=NIVELES_PIRAMIDE, pesos=PESOS_PIRAMIDE):
+        """
+        Analiza la simetría en varios niveles de una pirámide gaussiana: cada nivel
+        se obtiene del anterior con pyrDown y se puntúa con puntuacion_espejo. Los
+        niveles gruesos eliminan el ruido y la textura del pelaje, por lo que la
+        puntuación agregada es más estable que la de resolución completa.
+        
+        Args:
+            imagen (numpy.ndarray): Imagen (o vista) en formato BGR o escala de grises.
+            niveles (int): Número máximo de niveles (1 = solo resolución original).
+                Se limita al número de pesos: un nivel sin peso no contaría.
+            pesos (tuple): Peso de cada nivel, del más fino al más grueso.
+            
+        Returns:
+            tuple: (puntuacion_agregada, lista de puntuaciones por nivel)
+        """
+        if len(imagen.shape) == 3:
+            nivel = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        else:
+            nivel = imagen
+        
+        niveles = min(niveles, len(pesos))
+        puntuaciones = [self.puntuacion_espejo(nivel)]
+        # Se detiene antes si el nivel siguiente quedaría demasiado pequeño
+        while len(puntuaciones) < niveles and min(nivel.shape) >= 2 * LADO_MINIMO_PIRAMIDE:
+            nivel = cv2.pyrDown(nivel)
+            puntuaciones.append(self.puntuacion_espejo(nivel))
+        
+        pesos = pesos[:len(puntuaciones)]
+        agregada = sum(p * w for p, w in zip(puntuaciones, pesos)) / sum(pesos)
+        return agregada, puntuaciones
+    
+    def puntuar_rapido(self, gris, reduccion=1, niveles_piramide=1, incluir_mapa=False, normalizar_pose=False):
+        """
+        Ruta rápida que solo calcula la puntuación de simetría: detección y
+        puntuación sobre una imagen en escala de grises ya reducida (ver
+        cargar_gris_reducida), sin generar imágenes intermedias.
+        
+        Args:
+            gris (numpy.ndarray): Imagen en escala de grises.
+            reduccion (int): Factor de reducción con el que se decodificó la imagen,
+                para devolver las cajas en coordenadas de la imagen original.
+            niveles_piramide (int): Si es mayor que 1, puntúa con
+                analizar_simetria_piramide y añade 'puntuaciones_escala' a cada resultado.
+            incluir_mapa (bool): Si es True, añade 'mapa_asimetria' (codificado) a cada resultado.
+            normalizar_pose (bool): Si es True, endereza cada cara inclinada antes de
+                puntuarla y añade 'angulo_pose' a su resultado.
+            
+        Returns:
+            dict: Mismo formato que puntuar_imagen (sin imágenes).
+        """
+        def puntuar(caja):
+            region = self.region_cara(gris, caja)
+            angulo = 0.0
+            if normalizar_pose and caja is not None:
+                angulo = self.estimar_rotacion(gris, caja)
+                if angulo:
+                    region = self.enderezar_region(gris, caja, angulo, en_buffer=True)
+            # La misma diferencia sirve para el mapa y para la puntuación a una
+            # escala; el mapa se calcula antes de que otra llamada reutilice el buffer
+            diferencia = self.diferencia_espejo(region) if incluir_mapa or niveles_piramide <= 1 else None
+            mapa = self.mapa_asimetria(diferencia) if incluir_mapa else None
+            if niveles_piramide > 1:
+                puntuacion, escalas = self.analizar_simetria_piramide(region, niveles_piramide)
+                resultado = {'puntuacion_simetria': puntuacion, 'puntuaciones_escala': escalas}
+            else:
+                resultado = {'puntuacion_simetria': self.puntuacion_diferencia(diferencia)}
+            if mapa is not None:
+                resultado['mapa_asimetria'] = codificar_mapa_asimetria(mapa)
+            if normalizar_pose and caja is not None:
+                resultado['angulo_pose'] = angulo
+            return resultado
+        
+        resultados_caras = [dict(caja=[int(v * reduccion) for v in caja], **puntuar(caja))
+                            for caja in self.localizar_caras(gris)]
+        
+        if resultados_caras:
+            principal = dict(resultados_caras[0])
+        else:
+            principal = dict(caja=None, **puntuar(None))
+        principal['caras'] = resultados_caras
+        return principal
@@ -0,0 +1,171 @@
+import os
+import base64
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from procesamiento_imagenes import ProcesadorImagenes
+from perfiles import PERFIL_DEFECTO, cargar_perfiles, obtener_perfil
+
+# Configuración (detector, perfil por defecto, perfiles) y procesadores de cada
+# proceso de trabajo, uno por perfil (se crean una sola vez por proceso)
+_configuracion = None
+_procesadores = {}
+
+
+def inicializar_trabajador(detector=None, perfil=PERFIL_DEFECTO, perfiles=None):
+    """
+    Inicializa un proceso de trabajo creando el ProcesadorImagenes del perfil por
+    defecto, de modo que el detector de caras queda precargado antes de recibir
+    el primer lote.
+
+    Args:
+        detector (str): Nombre del detector de caras (por defecto, el de cada perfil).
+        perfil (str): Perfil por defecto del proceso.
+        perfiles (dict): Perfiles disponibles (por defecto, los de perfiles.json).
+    """
+    global _configuracion
+    # Cada proceso usa un solo hilo de OpenCV y aplica los filtros en secuencia
+    # para no sobresuscribir los núcleos
+    cv2.setNumThreads(1)
+    _configuracion = (detector, perfil, perfiles if perfiles is not None else cargar_perfiles())
+    _procesadores.clear()
+    obtener_procesador().precargar()
+
+
+def obtener_procesador(perfil=None):
+    """
+    Devuelve el ProcesadorImagenes del proceso actual para un perfil, creándolo
+    si aún no existe (o inicializando el proceso si no se inicializó con
+    inicializar_trabajador).
+
+    Args:
+        perfil (str): Nombre del perfil (por defecto, el del proceso).
+
+    Returns:
+        ProcesadorImagenes: Procesador propio del proceso.
+    """
+    if _configuracion is None:
+        inicializar_trabajador()
+    detector, perfil_defecto, perfiles = _configuracion
+    perfil = perfil or perfil_defecto
+    if perfil not in _procesadores:
+        _procesadores[perfil] = ProcesadorImagenes(detector, hilos_filtros=1,
+                                                   perfil=obtener_perfil(perfil, perfiles, detector))
+    return _procesadores[perfil]
+
+
+def codificar_previsualizacion(imagen, calidad=85):
+    """
+    Codifica una imagen como JPEG en base64 para enviarla en una respuesta JSON.
+
+    Args:
+        imagen (numpy.ndarray): Imagen en formato BGR.
+        calidad (int): Calidad JPEG (0-100).
+
+    Returns:
+        str: Imagen codificada en base64.
+    """
+    ok, buffer = cv2.imencode('.jpg', imagen, [cv2.IMWRITE_JPEG_QUALITY, calidad])
+    if not ok:
+        raise ValueError("No se pudo codificar la previsualización")
+    return base64.b64encode(buffer.tobytes()).decode('ascii')
+
+
+def puntuar_elementos(elementos, previsualizaciones=False, perfil=None):
+    """
+    Puntúa un lote de elementos dentro de un proceso de trabajo.
+
+    Args:
+        elementos (list): Lista de diccionarios con la clave 'ruta' (ruta de la
+            imagen) o 'datos' (bytes de la imagen).
+        previsualizaciones (bool): Si es True, añade al resultado las imágenes de
+            detección y de simetría codificadas en JPEG/base64.
+        perfil (str): Perfil del pipeline (por defecto, el del proceso).
+
+    Returns:
+        list: Un diccionario por elemento con la puntuación, la caja y las caras,
+            o con la clave 'error' si el elemento no se pudo procesar.
+    """
+    procesador = obtener_procesador(perfil)
+
+    # Decodificar primero todo el lote y después puntuarlo en bloque. La imagen
+    # que se puntúa depende solo del perfil; si se piden previsualizaciones y
+    # el perfil puntúa en escala de grises, se decodifica además en color
+    imagenes = []
+    colores = []
+    errores = {}
+    for i, elemento in enumerate(elementos):
+        try:
+            if elemento.get('datos') is not None:
+                imagen = procesador.decodificar_para_puntuar(elemento['datos'])
+                cargar_color = lambda: procesador.decodificar_imagen(elemento['datos'])
+            else:
+                imagen = procesador.cargar_para_puntuar(elemento['ruta'])
+                cargar_color = lambda: procesador.cargar_imagen(elemento['ruta'])
+            color = cargar_color() if previsualizaciones and imagen.ndim != 3 else None
+        except Exception as e:
+            imagen, color = None, None
+            errores[i] = str(e)
+        imagenes.append(imagen)
+        colores.append(color)
+
+    validas = [(imagen, color) for imagen, color in zip(imagenes, colores) if imagen is not None]
+    puntuaciones = iter(procesador.puntuar_lote([imagen for imagen, _ in validas], previsualizaciones,
+                                                [color for _, color in validas]))
+
+    resultados = []
+    for i, imagen in enumerate(imagenes):
+        if imagen is None:
+            resultados.append({'error': errores[i]})
+            continue
+
+        resultado = next(puntuaciones)
+        if previsualizaciones:
+            resultado['previsualizaciones'] = {
+                'deteccion_cara': codificar_previsualizacion(resultado.pop('deteccion_cara')),
+                'imagen_simetria': codificar_previsualizacion(resultado.pop('imagen_simetria'))
+            }
+        resultados.append(resultado)
+
+    return resultados
+
+
+def crear_pool(num_procesos=None, metodo_inicio=None, detector=None, perfil=PERFIL_DEFECTO, perfiles=None):
+    """
+    Crea un pool de procesos de trabajo con el clasificador ya precargado.
+
+    Args:
+        num_procesos (int): Número de procesos. Por defecto, uno por núcleo.
+        metodo_inicio (str): Método de creación de procesos ('spawn', 'fork'...).
+            Por defecto, el de la plataforma. Desde la interfaz se usa 'spawn'
+            para no duplicar el estado de Tk ni de sus hilos.
+        detector (str): Nombre del detector de caras de cada proceso (por
+            defecto, el de cada perfil).
+        perfil (str): Perfil por defecto de los procesos.
+        perfiles (dict): Perfiles disponibles (por defecto, los de perfiles.json).
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: Pool listo para recibir lotes.
+    """
+    num_procesos = num_procesos or os.cpu_count() or 1
+    contexto = multiprocessing.get_context(metodo_inicio) if metodo_inicio else None
+    # Los perfiles se leen una vez aquí y se envían a los procesos
+    if perfiles is None:
+        perfiles = cargar_perfiles()
+    obtener_perfil(perfil, perfiles, detector)
+    return ProcessPoolExecutor(max_workers=num_procesos, mp_context=contexto,
+                               initializer=inicializar_trabajador, initargs=(detector, perfil, perfiles))
+
+
+def calentar_pool(pool, num_procesos):
+    """
+    Arranca todos los procesos del pool enviándoles un lote vacío, para que el
+    primer lote real no pague la creación de procesos ni la carga del clasificador.
+
+    Args:
+        pool (concurrent.futures.ProcessPoolExecutor): Pool a calentar.
+        num_procesos (int): Número de procesos del pool.
+    """
+    futuros = [pool.submit(puntuar_elementos, []) for _ in range(num_procesos)]
+    for futuro in futuros:
+        futuro.result()
@@ -0,0 +1,498 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from procesamiento_lotes import crear_pool, calentar_pool, puntuar_elementos
+from detectores import DETECTORES
+from perfiles import PERFIL_DEFECTO, RUTA_PERFILES_DEFECTO, cargar_perfiles, obtener_perfil, metrica_perfil
+
+# Aviso que despierta al hilo agrupador cuando el pool de procesos se rompe
+_POOL_ROTO = object()
+
+
+class MetricasServicio:
+    """
+    Acumula métricas de latencia y rendimiento del servicio de puntuación.
+    Todas las operaciones son seguras entre hilos.
+    """
+
+    def __init__(self, ventana=1000):
+        self._lock = threading.Lock()
+        self.inicio = time.monotonic()
+        self.solicitudes = 0
+        self.imagenes = 0
+        self.errores = 0
+        self.lotes = 0
+        self.imagenes_en_lotes = 0
+        # Solo se guardan las últimas latencias para calcular percentiles
+        self.latencias = deque(maxlen=ventana)
+        self.latencias_lote = deque(maxlen=ventana)
+
+    def registrar_solicitud(self, latencia, num_imagenes, num_errores=0):
+        """
+        Registra una solicitud HTTP atendida.
+
+        Args:
+            latencia (float): Tiempo total de la solicitud en segundos.
+            num_imagenes (int): Imágenes incluidas en la solicitud.
+            num_errores (int): Imágenes que no se pudieron procesar.
+        """
+        with self._lock:
+            self.solicitudes += 1
+            self.imagenes += num_imagenes
+            self.errores += num_errores
+            self.latencias.append(latencia)
+
+    def registrar_lote(self, tamano, latencia):
+        """
+        Registra un lote enviado a los procesos de trabajo.
+
+        Args:
+            tamano (int): Número de imágenes del lote.
+            latencia (float): Tiempo de procesamiento del lote en segundos.
+        """
+        with self._lock:
+            self.lotes += 1
+            self.imagenes_en_lotes += tamano
+            self.latencias_lote.append(latencia)
+
+    @staticmethod
+    def _percentiles(valores):
+        if not valores:
+            return {'p50': None, 'p95': None, 'p99': None}
+        ordenados = sorted(valores)
+        def percentil(p):
+            return round(ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))] * 1000, 2)
+        return {'p50': percentil(0.50), 'p95': percentil(0.95), 'p99': percentil(0.99)}
+
+    def resumen(self):
+        """
+        Devuelve un resumen de las métricas acumuladas.
+
+        Returns:
+            dict: Contadores, percentiles de latencia (ms) y rendimiento (imágenes/s).
+        """
+        with self._lock:
+            transcurrido = max(time.monotonic() - self.inicio, 1e-9)
+            return {
+                'solicitudes': self.solicitudes,
+                'imagenes': self.imagenes,
+                'errores': self.errores,
+                'lotes': self.lotes,
+                'tamano_medio_lote': round(self.imagenes_en_lotes / self.lotes, 2) if self.lotes else 0,
+                'latencia_solicitud_ms': self._percentiles(self.latencias),
+                'latencia_lote_ms': self._percentiles(self.latencias_lote),
+                'imagenes_por_segundo': round(self.imagenes / transcurrido, 2),
+                'tiempo_activo_s': round(transcurrido, 1)
+            }
+
+
+class AgrupadorLotes:
+    """
+    Agrupa solicitudes concurrentes en micro-lotes y los envía a un pool de
+    procesos de trabajo. Un lote se despacha cuando alcanza el tamaño máximo
+    o cuando expira la espera máxima desde su primer elemento.
+
+    Si un proceso de trabajo muere (BrokenProcessPool), los lotes afectados
+    fallan con esa excepción y el pool se vuelve a crear con recrear_pool.
+    """
+
+    def __init__(self, pool, metricas, tamano_lote=8, espera_lote_ms=10, recrear_pool=None):
+        """
+        Args:
+            pool (concurrent.futures.ProcessPoolExecutor): Pool de procesos de trabajo.
+            metricas (MetricasServicio): Métricas donde se registran los lotes.
+            tamano_lote (int): Elementos máximos por lote.
+            espera_lote_ms (float): Espera máxima para completar un lote.
+            recrear_pool (callable): Función sin argumentos que crea un pool
+                nuevo cuando el actual se rompe. Si es None, no se recrea.
+        """
+        self.pool = pool
+        self.metricas = metricas
+        self.tamano_lote = tamano_lote
+        self.espera_lote = espera_lote_ms / 1000.0
+        self.recrear_pool = recrear_pool
+        self.pool_roto = False
+        self.reinicios_pool = 0
+        self.ultimo_error_pool = None
+        self._lock = threading.Lock()
+        self._cola = queue.Queue()
+        self._activo = True
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def enviar(self, elemento, previsualizaciones=False, perfil=None):
+        """
+        Encola un elemento para su puntuación.
+
+        Args:
+            elemento (dict): Diccionario con 'ruta' o 'datos'.
+            previsualizaciones (bool): Si se deben codificar previsualizaciones.
+            perfil (str): Perfil del pipeline (por defecto, el del servicio).
+
+        Returns:
+            concurrent.futures.Future: Futuro con el resultado del elemento.
+        """
+        futuro = Future()
+        self._cola.put((elemento, (previsualizaciones, perfil), futuro))
+        return futuro
+
+    def detener(self):
+        """
+        Detiene el hilo agrupador.
+        """
+        self._activo = False
+        self._cola.put(None)
+        self._hilo.join()
+
+    def estado(self):
+        """
+        Estado del pool de procesos de trabajo.
+
+        Returns:
+            dict: 'pool_roto', 'reinicios_pool' y 'ultimo_error_pool'.
+        """
+        # ProcessPoolExecutor marca el pool como roto en cuanto muere un proceso,
+        # aunque no haya ningún lote en vuelo que lo note
+        if getattr(self.pool, '_broken', False):
+            self._marcar_pool_roto(self.pool, BrokenProcessPool(self.pool._broken))
+        with self._lock:
+            return {'pool_roto': self.pool_roto, 'reinicios_pool': self.reinicios_pool,
+                    'ultimo_error_pool': self.ultimo_error_pool}
+
+    def _marcar_pool_roto(self, pool, error):
+        # Se llama desde el hilo de gestión del pool: el pool nuevo lo crea el
+        # hilo agrupador
+        with self._lock:
+            if pool is not self.pool or self.pool_roto:
+                return
+            self.pool_roto = True
+            self.ultimo_error_pool = str(error) or type(error).__name__
+        self._cola.put(_POOL_ROTO)
+
+    def _recuperar_pool(self):
+        with self._lock:
+            if not self.pool_roto or self.recrear_pool is None:
+                return
+            roto = self.pool
+        try:
+            nuevo = self.recrear_pool()
+        except Exception as e:
+            print(f"No se pudo recrear el pool de procesos: {e}")
+            return
+        roto.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self.pool = nuevo
+            self.pool_roto = False
+            self.reinicios_pool += 1
+
+    def _bucle(self):
+        while self._activo:
+            primero = self._cola.get()
+            if primero is None:
+                break
+            if primero is _POOL_ROTO:
+                self._recuperar_pool()
+                continue
+
+            # Acumular elementos hasta llenar el lote o agotar la espera
+            pendientes = [primero]
+            limite = time.monotonic() + self.espera_lote
+            while len(pendientes) < self.tamano_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    siguiente = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    self._activo = False
+                    break
+                if siguiente is _POOL_ROTO:
+                    continue
+                pendientes.append(siguiente)
+
+            # Las previsualizaciones y el perfil se piden por lote, así que se
+            # separa un grupo por cada combinación
+            grupos = {}
+            for pendiente in pendientes:
+                grupos.setdefault(pendiente[1], []).append(pendiente)
+            for opciones, grupo in grupos.items():
+                # Un fallo al despachar solo afecta a su grupo, nunca al hilo agrupador
+                try:
+                    self._despachar(grupo, *opciones)
+                except Exception as e:
+                    for _, _, futuro in grupo:
+                        futuro.set_exception(e)
+
+    def _enviar_lote(self, elementos, previsualizaciones, perfil):
+        self._recuperar_pool()
+        pool = self.pool
+        try:
+            return pool, pool.submit(puntuar_elementos, elementos, previsualizaciones, perfil)
+        except BrokenProcessPool as e:
+            # El pool se rompió sin ningún lote en vuelo: se recrea y se
+            # reintenta una vez, ya que este lote aún no se ha ejecutado
+            self._marcar_pool_roto(pool, e)
+            self._recuperar_pool()
+            pool = self.pool
+            return pool, pool.submit(puntuar_elementos, elementos, previsualizaciones, perfil)
+
+    def _despachar(self, grupo, previsualizaciones, perfil):
+        inicio = time.monotonic()
+        elementos = [elemento for elemento, _, _ in grupo]
+        pool, futuro_lote = self._enviar_lote(elementos, previsualizaciones, perfil)
+
+        def completar(f):
+            self.metricas.registrar_lote(len(grupo), time.monotonic() - inicio)
+            try:
+                resultados = f.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._marcar_pool_roto(pool, e)
+                for _, _, futuro in grupo:
+                    futuro.set_exception(e)
+                return
+            for (_, _, futuro), resultado in zip(grupo, resultados):
+                futuro.set_result(resultado)
+
+        futuro_lote.add_done_callback(completar)
+
+
+class ManejadorPuntuacion(BaseHTTPRequestHandler):
+    """
+    Manejador HTTP del servicio de puntuación.
+
+    Rutas:
+        GET  /salud     -> estado del servicio y de su pool de procesos (503 si
+                           el pool está roto y aún no se ha recreado).
+        GET  /metricas  -> métricas de latencia y rendimiento.
+        GET  /perfiles  -> perfiles disponibles, con su métrica (clave de caché).
+        POST /puntuar   -> puntúa bytes de imagen (cuerpo binario) o rutas
+                           (JSON con 'ruta' o 'rutas'). El parámetro
+                           'previsualizaciones' añade imágenes JPEG en base64
+                           y 'perfil' elige el perfil del pipeline.
+    """
+
+    # Lo asigna ServicioPuntuacion al crear el servidor
+    servicio = None
+
+    def log_message(self, formato, *args):
+        # Silenciar el registro por solicitud de BaseHTTPRequestHandler
+        pass
+
+    def _responder(self, codigo, contenido):
+        cuerpo = json.dumps(contenido).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        ruta = urlparse(self.path).path
+        if ruta == '/salud':
+            estado = self.servicio.agrupador.estado()
+            if estado['pool_roto']:
+                self._responder(503, dict(estado, estado='pool_roto'))
+            else:
+                self._responder(200, dict(estado, estado='recuperado' if estado['reinicios_pool'] else 'ok'))
+        elif ruta == '/metricas':
+            self._responder(200, self.servicio.metricas.resumen())
+        elif ruta == '/perfiles':
+            self._responder(200, {
+                'defecto': self.servicio.perfil,
+                'perfiles': {nombre: {'descripcion': perfil.get('descripcion', ''),
+                                      'metrica': self.servicio.metrica(nombre)}
+                             for nombre, perfil in self.servicio.perfiles.items()}
+            })
+        else:
+            self._responder(404, {'error': f"Ruta no encontrada: {ruta}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/puntuar':
+            self._responder(404, {'error': f"Ruta no encontrada: {url.path}"})
+            return
+
+        inicio = time.monotonic()
+        try:
+            longitud = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            longitud = -1
+        if longitud < 0:
+            self._responder(400, {'error': "Content-Length no válido"})
+            return
+        cuerpo = self.rfile.read(longitud)
+        parametros = parse_qs(url.query)
+        previsualizaciones = parametros.get('previsualizaciones', ['0'])[0] in ('1', 'true', 'si')
+        perfil = parametros.get('perfil', [None])[0]
+
+        # El cuerpo puede ser JSON con rutas o directamente los bytes de una imagen
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            try:
+                solicitud = json.loads(cuerpo or b'{}')
+            except ValueError as e:
+                self._responder(400, {'error': f"JSON no válido: {e}"})
+                return
+            if not isinstance(solicitud, dict):
+                self._responder(400, {'error': "El cuerpo JSON debe ser un objeto"})
+                return
+            previsualizaciones = bool(solicitud.get('previsualizaciones', previsualizaciones))
+            perfil = solicitud.get('perfil', perfil)
+            if 'rutas' in solicitud:
+                if not isinstance(solicitud['rutas'], list) or not all(isinstance(r, str) for r in solicitud['rutas']):
+                    self._responder(400, {'error': "'rutas' debe ser una lista de rutas"})
+                    return
+                elementos = [{'ruta': ruta} for ruta in solicitud['rutas']]
+            elif 'ruta' in solicitud:
+                if not isinstance(solicitud['ruta'], str):
+                    self._responder(400, {'error': "'ruta' debe ser una ruta"})
+                    return
+                elementos = [{'ruta': solicitud['ruta']}]
+            else:
+                self._responder(400, {'error': "Se esperaba la clave 'ruta' o 'rutas'"})
+                return
+            es_lista = 'rutas' in solicitud
+        else:
+            if not cuerpo:
+                self._responder(400, {'error': "El cuerpo de la solicitud está vacío"})
+                return
+            elementos = [{'datos': cuerpo}]
+            es_lista = False
+
+        if perfil is not None and (not isinstance(perfil, str) or perfil not in self.servicio.perfiles):
+            self._responder(400, {'error': f"Perfil no válido: {perfil!r}. Opciones: {', '.join(self.servicio.perfiles)}"})
+            return
+
+        futuros = [self.servicio.agrupador.enviar(e, previsualizaciones, perfil) for e in elementos]
+        try:
+            resultados = [f.result(timeout=self.servicio.tiempo_espera) for f in futuros]
+        except Exception as e:
+            self.servicio.metricas.registrar_solicitud(time.monotonic() - inicio, len(elementos), len(elementos))
+            if isinstance(e, TiempoAgotado):
+                self._responder(504, {'error': f"Sin respuesta de los procesos de trabajo en "
+                                               f"{self.servicio.tiempo_espera} s"})
+            elif isinstance(e, BrokenProcessPool):
+                self._responder(503, {'error': "Un proceso de trabajo terminó de forma inesperada; "
+                                               "el pool se está recreando, reintente la solicitud"})
+            else:
+                self._responder(500, {'error': str(e) or type(e).__name__})
+            return
+
+        num_errores = sum(1 for r in resultados if 'error' in r)
+        self.servicio.metricas.registrar_solicitud(time.monotonic() - inicio, len(elementos), num_errores)
+
+        if es_lista:
+            self._responder(200, {'resultados': resultados})
+        elif num_errores:
+            self._responder(422, resultados[0])
+        else:
+            self._responder(200, resultados[0])
+
+
+class ServicioPuntuacion:
+    """
+    Servicio HTTP local que expone la puntuación de simetría sin depender de Tk.
+    Mantiene un pool de procesos calientes, cada uno con su clasificador
+    precargado, y agrupa las solicitudes concurrentes en micro-lotes.
+    """
+
+    def __init__(self, host='127.0.0.1', puerto=8765, num_procesos=None,
+                 tamano_lote=8, espera_lote_ms=10, tiempo_espera=60, detector=None,
+                 perfil=PERFIL_DEFECTO, ruta_perfiles=RUTA_PERFILES_DEFECTO):
+        self.host = host
+        self.puerto = puerto
+        self.num_procesos = num_procesos or os.cpu_count() or 1
+        self.tamano_lote = tamano_lote
+        self.espera_lote_ms = espera_lote_ms
+        self.tiempo_espera = tiempo_espera
+        self.detector = detector
+        self.perfiles = cargar_perfiles(ruta_perfiles)
+        self.perfil = perfil
+        self.metricas = MetricasServicio()
+        self.pool = None
+        self.agrupador = None
+        self.servidor = None
+        self._hilo = None
+
+    @property
+    def direccion(self):
+        """
+        URL base del servicio (útil cuando se arranca con puerto 0).
+        """
+        host, puerto = self.servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def metrica(self, perfil=None):
+        """
+        Métrica (clave de caché) de los resultados de un perfil en este servicio.
+        """
+        return metrica_perfil(obtener_perfil(perfil or self.perfil, self.perfiles, self.detector))
+
+    def iniciar(self):
+        """
+        Arranca los procesos de trabajo y el servidor HTTP en un hilo de fondo.
+        """
+        self.pool = crear_pool(self.num_procesos, detector=self.detector, perfil=self.perfil, perfiles=self.perfiles)
+        calentar_pool(self.pool, self.num_procesos)
+        recrear = lambda: crear_pool(self.num_procesos, detector=self.detector, perfil=self.perfil,
+                                     perfiles=self.perfiles)
+        self.agrupador = AgrupadorLotes(self.pool, self.metricas, self.tamano_lote, self.espera_lote_ms, recrear)
+
+        manejador = type('Manejador', (ManejadorPuntuacion,), {'servicio': self})
+        self.servidor = ThreadingHTTPServer((self.host, self.puerto), manejador)
+        self.servidor.daemon_threads = True
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """
+        Detiene el servidor HTTP, el agrupador y los procesos de trabajo.
+        """
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+        if self.agrupador is not None:
+            self.agrupador.detener()
+            # El agrupador pudo haber recreado el pool
+            self.pool = self.agrupador.pool
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de puntuación de simetría")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos de trabajo (por defecto, uno por núcleo)")
+    parser.add_argument('--tamano-lote', type=int, default=8)
+    parser.add_argument('--espera-lote-ms', type=float, default=10)
+    parser.add_argument('--detector', choices=list(DETECTORES), default=None,
+                        help="Detector de caras (por defecto, el de cada perfil)")
+    parser.add_argument('--perfil', default=PERFIL_DEFECTO, help="Perfil por defecto del pipeline")
+    parser.add_argument('--perfiles', default=RUTA_PERFILES_DEFECTO, help="Archivo JSON de perfiles")
+    args = parser.parse_args()
+
+    servicio = ServicioPuntuacion(args.host, args.puerto, args.procesos, args.tamano_lote, args.espera_lote_ms,
+                                  detector=args.detector, perfil=args.perfil, ruta_perfiles=args.perfiles)
+    servicio.iniciar()
+    print(f"Servicio de puntuación escuchando en {servicio.direccion}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.detener()
+
+
+if __name__ == "__main__":
+    main()